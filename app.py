@@ -1,65 +1,180 @@
+import hashlib
 import json
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
-from modules.car_recommender import CarRecommendationSystem
-from modules.utils import convert_numpy_types, NumpyEncoder
+import logging
+from flask import Blueprint, Flask, Response, abort, current_app, request, jsonify, render_template, redirect, url_for, session
+from werkzeug.local import LocalProxy
+from modules.metrics import metrics
+from modules.payments import PaymentGateway, idempotency_key
+from modules.recommender_service import RecommenderService
+from modules.utils import NumpyJSONProvider, configure_logging
 import os
-import stripe
 import uuid
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from flask_mail import Mail, Message
 
 load_dotenv()
 
-# Create Flask application
-app = Flask(__name__)
-# Flask-Mail SMTP configuration
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('EMAIL_USER')  # Gmail email
-app.config['MAIL_PASSWORD'] = os.environ.get('EMAIL_PASS')  # App password
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('EMAIL_USER')
+logger = logging.getLogger(__name__)
 
-mail = Mail(app)
+bp = Blueprint('main', __name__)
 
-# Secret key for session management
-app.secret_key = os.urandom(24)
+def create_app(config=None, data_source=None):
+    """
+    Create the Flask application.
 
-# Apply the custom JSON encoder
-app.json_encoder = NumpyEncoder
+    The recommender is built by a RecommenderService according to
+    RECOMMENDER_WARMUP: 'background' (default) loads data on a daemon thread so
+    startup doesn't block, 'eager' loads before returning and 'lazy' on first use.
+    In eager mode a failed build is raised from here; otherwise it is retried
+    with backoff, and /healthz fails once the attempts are used up.
 
-# Configure Stripe with your secret key from .env file
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
-# Initialize the recommendation system
-recommender = CarRecommendationSystem()
+    Args:
+        config (dict, optional): Overrides for app.config
+        data_source (DataSource, optional): Data source for the recommender.
+            Defaults to the one selected by DATA_SOURCE.
+    """
+    from flask_mail import Mail
 
-@app.route('/')
+    # Leveled logging; LOG_SAMPLE_RATE keeps only a fraction of DEBUG/INFO records on hot paths
+    configure_logging(os.environ.get('LOG_LEVEL', 'INFO'), float(os.environ.get('LOG_SAMPLE_RATE', '1.0')))
+
+    # Create Flask application
+    app = Flask(__name__)
+    # Flask-Mail SMTP configuration
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = os.environ.get('EMAIL_USER')  # Gmail email
+    app.config['MAIL_PASSWORD'] = os.environ.get('EMAIL_PASS')  # App password
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('EMAIL_USER')
+
+    # Secret key for session management
+    app.config['SECRET_KEY'] = os.urandom(24)
+
+    # Stripe keys from .env file; the stripe module itself is imported on first payment
+    app.config['STRIPE_SECRET_KEY'] = os.environ.get('STRIPE_SECRET_KEY')
+    app.config['STRIPE_PUBLIC_KEY'] = os.environ.get('STRIPE_PUBLIC_KEY')
+    # Alternative API address, e.g. a local fake server for load tests
+    app.config['STRIPE_API_BASE'] = os.environ.get('STRIPE_API_BASE')
+    # Per-call timeout and SDK retries, and the size of the keep-alive connection pool
+    app.config['STRIPE_TIMEOUT'] = float(os.environ.get('STRIPE_TIMEOUT', '10'))
+    app.config['STRIPE_MAX_RETRIES'] = int(os.environ.get('STRIPE_MAX_RETRIES', '2'))
+    app.config['STRIPE_POOL_SIZE'] = int(os.environ.get('STRIPE_POOL_SIZE', '20'))
+    # Seconds a succeeded/canceled intent is reused for repeated process_payment calls
+    app.config['STRIPE_RETRIEVE_CACHE_TTL'] = float(os.environ.get('STRIPE_RETRIEVE_CACHE_TTL', '30'))
+
+    app.config['RECOMMENDER_WARMUP'] = os.environ.get('RECOMMENDER_WARMUP', 'background')
+    # Seconds a request waits for a background warm-up before answering 503
+    app.config['RECOMMENDER_WAIT_TIMEOUT'] = float(os.environ.get('RECOMMENDER_WAIT_TIMEOUT', '30'))
+    # Build attempts before giving up, and the initial delay between them (doubled after each failure)
+    app.config['RECOMMENDER_BUILD_ATTEMPTS'] = int(os.environ.get('RECOMMENDER_BUILD_ATTEMPTS', '5'))
+    app.config['RECOMMENDER_RETRY_BACKOFF'] = float(os.environ.get('RECOMMENDER_RETRY_BACKOFF', '2'))
+
+    # Seconds between background reloads of the car catalog; 0 disables reloading
+    app.config['CATALOG_RELOAD_INTERVAL'] = float(os.environ.get('CATALOG_RELOAD_INTERVAL', '0'))
+
+    # Catalog-derived responses carry an ETag; clients revalidate them on every use
+    app.config['CATALOG_CACHE_CONTROL'] = os.environ.get('CATALOG_CACHE_CONTROL', 'no-cache')
+
+    if config:
+        app.config.update(config)
+
+    Mail(app)
+
+    app.extensions['payments'] = PaymentGateway(
+        app.config['STRIPE_SECRET_KEY'],
+        api_base=app.config['STRIPE_API_BASE'],
+        timeout=app.config['STRIPE_TIMEOUT'],
+        max_retries=app.config['STRIPE_MAX_RETRIES'],
+        pool_size=app.config['STRIPE_POOL_SIZE'],
+        retrieve_ttl=app.config['STRIPE_RETRIEVE_CACHE_TTL'])
+
+    # Serialize NumPy types in jsonify() responses
+    app.json = NumpyJSONProvider(app)
+
+    def build_recommender():
+        from modules.car_recommender import CarRecommendationSystem
+        recommender = CarRecommendationSystem(data_source)
+        if app.config['CATALOG_RELOAD_INTERVAL'] > 0:
+            recommender.start_catalog_reloader(app.config['CATALOG_RELOAD_INTERVAL'])
+        return recommender
+
+    # Initialize the recommendation system
+    service = RecommenderService(build_recommender, app.config['RECOMMENDER_WARMUP'],
+                                 attempts=app.config['RECOMMENDER_BUILD_ATTEMPTS'],
+                                 backoff=app.config['RECOMMENDER_RETRY_BACKOFF'])
+    app.extensions['recommender'] = service
+    app.register_blueprint(bp)
+    service.start()
+    return app
+
+def _current_recommender():
+    """The app's recommender, or abort with 503 while it is still warming up."""
+    recommender = current_app.extensions['recommender'].get(current_app.config['RECOMMENDER_WAIT_TIMEOUT'])
+    if recommender is None:
+        abort(503, description="Recommendation engine is not ready")
+    return recommender
+
+recommender = LocalProxy(_current_recommender)
+
+def _payments():
+    """The app's PaymentGateway."""
+    return current_app.extensions['payments']
+
+def _catalog_response(resource, build):
+    """
+    Serve a response derived only from the car catalog, with a strong ETag.
+
+    `build` is called with the catalog snapshot the ETag was computed from, so
+    a reload in between can't pair one version's ETag with another's body. A
+    matching If-None-Match (weak comparison, as proxies that compress
+    responses send the ETag back as W/"...") is answered with 304 before
+    `build` runs. The ETag changes whenever the catalog content (and so its
+    version) does.
+    """
+    catalog = recommender.catalog
+    etag = catalog.etag(resource)
+    not_modified = request.if_none_match.contains_weak(etag)
+    metrics.count_cache('http_etag', not_modified)
+    response = Response(status=304) if not_modified else build(catalog)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config['CATALOG_CACHE_CONTROL']
+    return response
+
+def _index_template_hash():
+    """Short hash of the index template, so a redeploy changes the page ETag even if the catalog didn't."""
+    template_hash = current_app.config.get('INDEX_TEMPLATE_HASH')
+    if template_hash is None:
+        source, _, _ = current_app.jinja_loader.get_source(current_app.jinja_env, 'index.html')
+        template_hash = current_app.config['INDEX_TEMPLATE_HASH'] = hashlib.sha256(source.encode()).hexdigest()[:8]
+    return template_hash
+
+@bp.route('/')
 def index():
-    locations = recommender.get_valid_locations()
-    return render_template('index.html', locations=locations)
+    return _catalog_response(
+        f"index-{_index_template_hash()}",
+        lambda catalog: Response(render_template('index.html', locations=list(catalog.locations))))
 
-@app.route('/api/locations', methods=['GET'])
+@bp.route('/api/locations', methods=['GET'])
 def get_locations():
     """Get list of valid locations."""
-    locations = recommender.get_valid_locations()
-    return jsonify({"locations": locations})
+    return _catalog_response(
+        'locations', lambda catalog: Response(catalog.locations_json, mimetype='application/json'))
 
-@app.route('/api/car_types', methods=['GET'])
+@bp.route('/api/car_types', methods=['GET'])
 def get_car_types():
     """Get list of valid car types."""
-    car_types = recommender.get_valid_car_types()
-    return jsonify({"car_types": car_types})
+    return _catalog_response(
+        'car_types', lambda catalog: Response(catalog.car_types_json, mimetype='application/json'))
 
-@app.route('/api/check_user', methods=['POST'])
+@bp.route('/api/check_user', methods=['POST'])
 def check_user():
     """Check if user exists and determine recommendation method."""
     data = request.get_json()
     name = data.get('name')
     email = data.get('email')
     location = data.get('location')
-    print("check_user function's data:", name, email, location)
+    logger.debug("check_user for location %s", location)
     
     if not name or not email or not location:
         return jsonify({"error": "Name, email, and location are required"}), 400
@@ -97,7 +212,7 @@ def check_user():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/content_recommendations', methods=['POST'])
+@bp.route('/api/content_recommendations', methods=['POST'])
 def content_recommendations():
     """Get content-based recommendations."""
     data = request.get_json()
@@ -123,16 +238,14 @@ def content_recommendations():
         return jsonify(sim_result), 400
         
     # Step 4: Get recommendations
-    recommendations = recommender.recommend_similar_cars()
-    # Convert all numpy types before jsonify
-    safe_recommendations = convert_numpy_types(recommendations)
-     
-    return jsonify({
-        "recommendations": safe_recommendations,
-        "count": len(safe_recommendations)
-    })
-
-@app.route('/api/collaborative_recommendations', methods=['POST'])
+    # Known users' rental history personalises the re-ranking
+    user_id = session.get('user_info', {}).get('user_id')
+    car_ids = recommender.recommend_similar_car_ids(user_id)
+    # Assemble the response from the catalog's pre-rendered car details
+    with metrics.timer('recommender_stage_seconds', pipeline='content', stage='serialization'):
+        return _recommendations_response(car_ids)
+
+@bp.route('/api/collaborative_recommendations', methods=['POST'])
 def collaborative_recommendations():
     """Get collaborative filtering recommendations."""
     data = request.get_json()
@@ -142,19 +255,21 @@ def collaborative_recommendations():
     if not user_id or not location:
         return jsonify({"error": "User ID and location are required"}), 400
         
-    recommendations = recommender.recommend_cf_cars(user_id, location)
+    car_ids = recommender.recommend_cf_car_ids(user_id, location)
     
-    if isinstance(recommendations, dict) and 'error' in recommendations:
-        return jsonify(recommendations), 400
-    # Convert all numpy types before jsonify
-    safe_recommendations = convert_numpy_types(recommendations)
-     
-    return jsonify({
-        "recommendations": safe_recommendations,
-        "count": len(safe_recommendations)
-    })
-
-@app.route('/confirm_booking/<car_id>', methods=['GET'])
+    if isinstance(car_ids, dict) and 'error' in car_ids:
+        return jsonify(car_ids), 400
+    # Assemble the response from the catalog's pre-rendered car details
+    with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='serialization'):
+        return _recommendations_response(car_ids)
+
+def _recommendations_response(car_ids):
+    """JSON response {"recommendations": [...], "count": n} built by joining cached detail fragments."""
+    details, count = recommender.render_car_details(car_ids)
+    body = b'{"recommendations":' + details + b',"count":' + str(count).encode() + b'}'
+    return Response(body, mimetype='application/json')
+
+@bp.route('/confirm_booking/<car_id>', methods=['GET'])
 def confirm_booking(car_id):
     """Show booking confirmation page for selected car."""
     try:
@@ -178,7 +293,7 @@ def confirm_booking(car_id):
                           days=rental_days,
                           total_cost=total_cost)
 
-@app.route('/payment/<car_id>', methods=['GET'])
+@bp.route('/payment/<car_id>', methods=['GET'])
 def payment_page(car_id):
     """Show the payment form page."""
     try:
@@ -195,14 +310,17 @@ def payment_page(car_id):
     
     # Calculate total amount
     total_amount = int(car_details['price_per_day']) * rental_days
+
+    # Identifies this checkout, so a resubmitted create_payment_intent returns the same intent
+    session['checkout_id'] = uuid.uuid4().hex
     
     return render_template('payment.html', 
                           car=car_details, 
                           days=rental_days,
                           amount=total_amount,
-                          stripe_public_key=STRIPE_PUBLIC_KEY)
+                          stripe_public_key=current_app.config['STRIPE_PUBLIC_KEY'])
 
-@app.route('/create_payment_intent', methods=['POST'])
+@bp.route('/create_payment_intent', methods=['POST'])
 def create_payment_intent():
     """Create a PaymentIntent for Stripe."""
     data = request.get_json()
@@ -225,7 +343,7 @@ def create_payment_intent():
     
     # Create payment intent
     try:
-        intent = stripe.PaymentIntent.create(
+        intent = _payments().create_payment_intent(
             amount=amount,
             currency='inr',
             metadata={
@@ -235,7 +353,9 @@ def create_payment_intent():
                 'user_name': name,
                 'user_email': email,
                 'pickup_location': location
-            }
+            },
+            idempotency_key=idempotency_key('create', session.get('checkout_id') or uuid.uuid4().hex,
+                                            car_id, rental_days, amount, email)
         )
         
         # Store booking reference in session for success page
@@ -257,7 +377,7 @@ def create_payment_intent():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-@app.route('/update_payment_intent', methods=['POST'])
+@bp.route('/update_payment_intent', methods=['POST'])
 def update_payment_intent():
     """Update a PaymentIntent with customer email."""
     data = request.get_json()
@@ -276,7 +396,7 @@ def update_payment_intent():
         payment_intent_id = client_secret.split('_secret_')[0]
         
         # Update the payment intent with the email
-        intent = stripe.PaymentIntent.modify(
+        intent = _payments().modify_payment_intent(
             payment_intent_id,
             receipt_email=email,
             metadata={'customer_email': email, 'payment_date': current_time}
@@ -290,12 +410,12 @@ def update_payment_intent():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-@app.route('/process_payment', methods=['POST'])
+@bp.route('/process_payment', methods=['POST'])
 def process_payment():
     """Process payment confirmation from client."""
     data = request.get_json()
-    print(data)
     payment_intent_id = data.get('payment_intent_id')
+    logger.debug("process_payment for payment intent %s", payment_intent_id)
     email = data.get('email')
     
     # Get user information from session if available
@@ -305,8 +425,8 @@ def process_payment():
     email = email or user_info.get('email', '')
     
     try:
-        # Retrieve the payment intent to confirm it's succeeded
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        # Retrieve the payment intent to confirm it's succeeded; repeated submissions share one request
+        intent = _payments().retrieve_payment_intent(payment_intent_id)
         
         if intent.status == 'succeeded':
             # Update booking with email, name, and location
@@ -335,7 +455,11 @@ def process_payment():
                     user_id = user_result["user_id"]
                 
                 # Record the rental
-                if user_id is not None:
+                if user_id is None:
+                    metrics.inc('bookings_not_saved_total', reason='user')
+                    logger.error("Paid booking for payment intent %s was not saved: the user could not be created",
+                                 payment_intent_id)
+                else:
                     # Generate rental dates
                     rental_date = datetime.now()
                     return_date = rental_date + timedelta(days=rental_days)
@@ -365,26 +489,30 @@ def process_payment():
                         'Duration_Days': rental_days
                     }
                     
-                    recommender.record_rental(rental_data)
+                    travel_code = recommender.record_rental(rental_data)
                     
-                    # Store travel code in session if available
-                    travel_code = recommender.get_last_travel_code()
+                    # Store this rental's travel code in session
                     if travel_code is not None:
                         session['booking']['travel_code'] = travel_code
+                    else:
+                        metrics.inc('bookings_not_saved_total', reason='rental')
+                        logger.error("Paid booking for payment intent %s was not saved: the rental could not be recorded",
+                                     payment_intent_id)
             
-            except Exception as e:
-                print(f"Failed to record booking: {str(e)}")
+            except Exception:
+                metrics.inc('bookings_not_saved_total', reason='error')
+                logger.exception("Failed to record booking for payment intent %s", payment_intent_id)
             
             # Send email receipt
             if email:
                 try:
                     send_receipt_email(email, car_id, rental_days, amount)
-                except Exception as e:
-                    print(f"Failed to send email receipt: {str(e)}")
+                except Exception:
+                    logger.exception("Failed to send email receipt for payment intent %s", payment_intent_id)
             
             return jsonify({
                 'success': True,
-                'redirect': url_for('payment_success')
+                'redirect': url_for('main.payment_success')
             })
         
         else:
@@ -396,12 +524,12 @@ def process_payment():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
-@app.route('/payment_success', methods=['GET'])
+@bp.route('/payment_success', methods=['GET'])
 def payment_success():
     """Handle successful payment."""
     booking = session.get('booking', {})
     if not booking:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     car_id = booking.get('car_id')
     car_details = recommender.get_car_details(car_id)
@@ -415,6 +543,32 @@ def payment_success():
                           email=booking.get('email'),
                           name=booking.get('name'))
 
+@bp.teardown_app_request
+def reset_recommender_pipeline(exc):
+    """Release the request thread's pipeline state so it doesn't pin an old catalog."""
+    service = current_app.extensions['recommender']
+    if service.ready:
+        service.get().reset_pipeline()
+
+@bp.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests, and the recommender hasn't given up building."""
+    service = current_app.extensions['recommender']
+    if service.failed:
+        return jsonify({"status": "failed", "error": service.error}), 503
+    return jsonify({"status": "ok"})
+
+@bp.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once data is loaded and indexes are hot, 503 before."""
+    status = current_app.extensions['recommender'].status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose stage timings, cache counters and Mongo/Stripe call durations for Prometheus."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 def send_receipt_email(email, car_id, rental_days, amount):
     """Send payment receipt email to customer."""
     # Get car details
@@ -428,6 +582,8 @@ def send_receipt_email(email, car_id, rental_days, amount):
     payment_date = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
     
     sender_email=os.environ.get('EMAIL_USER')
+    from flask_mail import Message
+
     # Create message
     msg = Message(subject="✅ Car Rental Payment Receipt",sender=sender_email,
                   recipients=[email])
@@ -442,9 +598,21 @@ def send_receipt_email(email, car_id, rental_days, amount):
     )
     
     # Send email
-    mail.send(msg)
+    current_app.extensions['mail'].send(msg)
     
     return True
 
+_app = None
+
+def __getattr__(name):
+    # `app` is created on first access (e.g. by gunicorn's app:app or flask run),
+    # so importing this module for create_app() doesn't start a second recommender.
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Benchmark the user/rental lookups against collection size, with and without
+the indexes declared in modules/db_indexes.py.
+
+Runs against a scratch database on a local MongoDB instance (never the
+application database) and drops it afterwards:
+
+    python -m benchmarks.bench_indexes --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import time
+from pymongo import MongoClient
+from modules.db_indexes import INDEX_SPECS, covered_projection, ensure_indexes, USER_ID_PROJECTION
+
+
+def populate(db, size):
+    """Fill the user, users and rentals collections with `size` documents each."""
+    for name in INDEX_SPECS:
+        db[name].drop()
+    batch = 10000
+    for start in range(0, size, batch):
+        ids = range(start, min(start + batch, size))
+        db['user'].insert_many([{"user_id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in ids])
+        db['users'].insert_many([{"user_id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in ids])
+        db['rentals'].insert_many([{"travelCode": i, "user_id": i % 997, "Car_Id": i % 503} for i in ids])
+
+
+def queries(db, size):
+    """The application's lookups, as (label, cursor factory) pairs."""
+    target = size // 2
+    return [
+        ("user by name+email", lambda: db['user'].find(
+            {"name": f"user{target}", "email": f"user{target}@example.com"}, USER_ID_PROJECTION).limit(1)),
+        ("max users.user_id", lambda: db['users'].find(
+            {}, covered_projection("user_id")).sort("user_id", -1).limit(1)),
+        ("max rentals.travelCode", lambda: db['rentals'].find(
+            {}, covered_projection("travelCode")).sort("travelCode", -1).limit(1)),
+    ]
+
+
+def explain_summary(cursor):
+    """Docs examined and plan stages of the winning plan."""
+    plan = cursor.explain()
+    stats = plan.get('executionStats', {})
+    winning = str(plan.get('queryPlanner', {}).get('winningPlan', {}))
+    if 'IXSCAN' not in winning:
+        stage = "COLLSCAN"
+    elif stats.get('totalDocsExamined') == 0:
+        stage = "IXSCAN (covered)"
+    else:
+        stage = "IXSCAN + FETCH"
+    return stage, stats.get('totalDocsExamined')
+
+
+def median_ms(make_cursor, repeat):
+    """Median wall time of exhausting the cursor, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(make_cursor())
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=os.getenv('BENCH_MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db', default='tripglide_index_bench')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.db == 'tripglide':
+        parser.error("refusing to benchmark against the application database")
+
+    client = MongoClient(args.uri)
+    db = client[args.db]
+    print(f"{'size':>9}  {'query':<24} {'indexes':<8} {'median ms':>10}  {'docs examined':>13}  plan")
+    try:
+        for size in args.sizes:
+            populate(db, size)
+            for indexed in (False, True):
+                if indexed:
+                    ensure_indexes(db)
+                for label, make_cursor in queries(db, size):
+                    stage, docs = explain_summary(make_cursor())
+                    ms = median_ms(make_cursor, args.repeat)
+                    print(f"{size:>9}  {label:<24} {'yes' if indexed else 'no':<8} {ms:>10.3f}  {docs!s:>13}  {stage}")
+    finally:
+        client.drop_database(args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark the recommendation hot paths on synthetic data, without MongoDB.
+
+For each fleet size a catalog and rental history are generated with
+benchmarks/synthetic.py and handed to CarRecommendationSystem directly.
+Each operation is timed over --repeat randomly drawn queries, then run once
+more under tracemalloc to record its peak allocation.
+
+    python -m benchmarks.bench_recommender
+    python -m benchmarks.bench_recommender --fleet-sizes 1000 --repeat 50
+    python -m benchmarks.bench_recommender --cf-backend als
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from modules.car_recommender import CarRecommendationSystem
+from benchmarks.synthetic import generate_cars, generate_rentals
+
+
+def content_query(recommender, car):
+    """Run the content-based pipeline for preferences matching `car`."""
+    recommender.filter_by_location(car["City"])
+    recommender.apply_user_preferences(car["Car Type"], str(car["Price per Hour (INR)"]),
+                                       car["AC"], car["Umlimited Mileage"])
+
+
+def build_operations(recommender, cars, rentals, rng):
+    """
+    Operations to benchmark, as name -> (setup, run). setup draws a random
+    query and is not timed; run is the measured call.
+    """
+    state = {}
+
+    def pick_car():
+        state["car"] = cars.iloc[rng.integers(len(cars))]
+
+    def pick_rental():
+        row = rentals.iloc[rng.integers(len(rentals))]
+        state["user_id"] = int(row["user_id"])
+        state["city"] = row["Pickup_Location"]
+
+    def pick_car_ids():
+        state["car_ids"] = [int(i) for i in rng.choice(cars["Car_Id"].to_numpy(), size=5)]
+
+    def prepare_content():
+        pick_car()
+        content_query(recommender, state["car"])
+
+    def prepare_similar():
+        prepare_content()
+        recommender.compute_similarity()
+
+    return {
+        "compute_similarity": (prepare_content, lambda: recommender.compute_similarity()),
+        "recommend_similar_cars": (prepare_similar, lambda: recommender.recommend_similar_cars()),
+        "create_user_car_matrix": (pick_rental, lambda: recommender.create_user_car_matrix(state["city"])),
+        "recommend_cf_cars": (pick_rental, lambda: recommender.recommend_cf_cars(state["user_id"], state["city"])),
+        "get_car_details (5 ids)": (pick_car_ids, lambda: recommender.get_car_details(state["car_ids"])),
+        "get_car_details (1 id)": (pick_car_ids, lambda: recommender.get_car_details(state["car_ids"][0])),
+    }
+
+
+def measure(setup, run, repeat):
+    """Return (latencies in ms, peak traced bytes) for `run`."""
+    latencies = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return np.array(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fleet-sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--rentals-per-car', type=int, default=100)
+    parser.add_argument('--max-rentals', type=int, default=10_000_000)
+    parser.add_argument('--users-per-car', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cf-backend', choices=['item_cosine', 'als'], default='item_cosine')
+    args = parser.parse_args()
+
+    header = f"{'operation':<26} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak MiB':>9}"
+    for n_cars in args.fleet_sizes:
+        n_rentals = min(n_cars * args.rentals_per_car, args.max_rentals)
+        n_users = max(1, int(n_cars * args.users_per_car))
+
+        start = time.perf_counter()
+        cars = generate_cars(n_cars, seed=args.seed)
+        rentals = generate_rentals(n_rentals, cars, n_users, seed=args.seed)
+        generated = time.perf_counter() - start
+        als_model, trained = None, 0.0
+        if args.cf_backend == 'als':
+            # Trained up front, as the offline job would; the serving process only loads it
+            from modules.matrix_factorization import train_from_rentals
+            als_model = train_from_rentals(rentals)
+            trained = time.perf_counter() - start - generated
+        recommender = CarRecommendationSystem(car_df=cars, rental_df=rentals, cf_backend=args.cf_backend,
+                                              als_model=als_model)
+        print(f"\n{n_cars:,} cars, {n_rentals:,} rentals, {n_users:,} users "
+              f"(generated in {generated:.1f}s, ALS trained in {trained:.1f}s, "
+              f"recommender built in {time.perf_counter() - start - generated - trained:.1f}s, "
+              f"CF backend {args.cf_backend})")
+        print(header)
+
+        rng = np.random.default_rng(args.seed)
+        for name, (setup, run) in build_operations(recommender, cars, rentals, rng).items():
+            latencies, peak = measure(setup, run, args.repeat)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(f"{name:<26} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} {latencies.max():>9.2f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+A local stand-in for the Stripe PaymentIntents API, for load tests.
+
+Implements just what the app calls, with Stripe's form-encoded requests and
+JSON responses:
+
+    POST /v1/payment_intents              create
+    POST /v1/payment_intents/<id>         update
+    GET  /v1/payment_intents/<id>         retrieve
+    POST /v1/payment_intents/<id>/confirm confirm
+
+Intents are created already 'succeeded' unless --require-confirm is given,
+since card confirmation normally happens in the browser. Idempotency-Key is
+honoured on POSTs, and --latency adds a fixed delay to every response to
+stand in for the network round trip to Stripe.
+
+    python -m benchmarks.fake_stripe --port 12111 --latency 0.15
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_fake python app.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+_INTENT_PATH = re.compile(r'^/v1/payment_intents(?:/(pi_\w+))?(/confirm)?$')
+_BRACKETS = re.compile(r'\[([^\]]*)\]')
+
+
+def parse_form(body):
+    """Decode Stripe's form encoding (metadata[car_id]=5) into nested dicts."""
+    params = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        head = key.split('[', 1)[0]
+        path = [head] + _BRACKETS.findall(key)
+        target = params
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = value
+    return params
+
+
+class FakeStripe:
+    """In-memory PaymentIntent store shared by the server's handler threads."""
+
+    def __init__(self, latency=0.0, auto_confirm=True):
+        self.latency = latency
+        self.auto_confirm = auto_confirm
+        self.intents = {}
+        self.requests = 0
+        self._responses = {}  # Idempotency-Key -> (status, body)
+        self._lock = threading.Lock()
+
+    def handle(self, method, path, params, key=None):
+        """Return (HTTP status, JSON-serializable body) for one API request."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if method == 'POST' and key and key in self._responses:
+                return self._responses[key]
+            response = self._dispatch(method, path, params)
+            if method == 'POST' and key and response[0] == 200:
+                self._responses[key] = response
+            return response
+
+    def _dispatch(self, method, path, params):
+        match = _INTENT_PATH.match(path)
+        if match is None:
+            return _error(404, f"Unrecognized request URL ({method}: {path})")
+        intent_id, confirm = match.groups()
+
+        if intent_id is None:
+            if method != 'POST':
+                return _error(405, "Only creating PaymentIntents is supported")
+            return 200, self._create(params)
+
+        intent = self.intents.get(intent_id)
+        if intent is None:
+            return _error(404, f"No such payment_intent: '{intent_id}'", code='resource_missing')
+        if method == 'GET':
+            return 200, intent
+        if confirm:
+            intent['status'] = 'succeeded'
+        else:
+            metadata = params.pop('metadata', {})
+            intent.update(params)
+            intent['metadata'].update(metadata)
+        return 200, intent
+
+    def _create(self, params):
+        intent_id = f"pi_{uuid.uuid4().hex[:24]}"
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(params.get('amount', 0)),
+            'currency': params.get('currency', 'inr'),
+            'metadata': params.get('metadata', {}),
+            'receipt_email': None,
+            'client_secret': f"{intent_id}_secret_{uuid.uuid4().hex[:24]}",
+            'status': 'succeeded' if self.auto_confirm else 'requires_payment_method',
+            'created': int(time.time()),
+            'livemode': False,
+        }
+        self.intents[intent_id] = intent
+        return intent
+
+
+def _error(status, message, code=None):
+    return status, {'error': {'type': 'invalid_request_error', 'message': message, 'code': code}}
+
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def do_GET(self):
+            self._respond('GET')
+
+        def do_POST(self):
+            self._respond('POST')
+
+        def _respond(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length).decode() if length else ''
+            path, _, query = self.path.partition('?')
+            params = parse_form(body or query)
+            status, payload = fake.handle(method, path, params, self.headers.get('Idempotency-Key'))
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Request-Id', f"req_{uuid.uuid4().hex[:14]}")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_stripe(host='127.0.0.1', port=0, latency=0.0, auto_confirm=True):
+    """
+    Serve a FakeStripe on a daemon thread.
+
+    Returns:
+        tuple: (server, fake, base URL to use as STRIPE_API_BASE); call
+        server.shutdown() to stop it
+    """
+    fake = FakeStripe(latency, auto_confirm)
+    server = ThreadingHTTPServer((host, port), _handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-stripe', daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--require-confirm', action='store_true',
+                        help="create intents as requires_payment_method until /confirm is called")
+    args = parser.parse_args()
+
+    server, _, base_url = start_fake_stripe(args.host, args.port, args.latency, not args.require_confirm)
+    print(f"Fake Stripe API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Load-test the booking funnel end to end over HTTP.
+
+Each virtual user replays what static/js/main.js and the payment page do in
+a browser, with its own cookie session:
+
+    GET  /                           (index page)
+    GET  /api/locations, /api/car_types   (revalidated with If-None-Match)
+    POST /api/check_user
+    POST /api/collaborative_recommendations   (returning users with history)
+    POST /api/content_recommendations         (new users, or CF fallback)
+    GET  /confirm_booking/<car_id>?days=N
+    GET  /payment/<car_id>?days=N
+    POST /create_payment_intent, /update_payment_intent, /process_payment
+    GET  /payment_success
+
+By default the app is started in-process on synthetic in-memory data, with
+benchmarks/fake_stripe.py in place of Stripe and Flask-Mail's
+MAIL_SUPPRESS_SEND in place of SMTP, and served by werkzeug's threaded
+server. --target points the users at an already-running server instead,
+e.g. gunicorn started with STRIPE_API_BASE and DATA_SOURCE set accordingly.
+
+Each --concurrency level runs for --duration seconds and reports, per
+endpoint, requests per second, latency percentiles and the share of
+requests that got a 4xx, got a 5xx, or failed outright (timeout or
+connection error). 4xx responses are mostly expected, e.g. "No cars match
+your preferences" for a random form; saturation shows up as 5xx and failures.
+
+    python -m benchmarks.loadgen
+    python -m benchmarks.loadgen --concurrency 1 8 32 64 --duration 20 --stripe-latency 0.2
+    python -m benchmarks.loadgen --target http://127.0.0.1:8000 --concurrency 16
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+import numpy as np
+import requests
+from benchmarks.synthetic import generate_cars, generate_rentals, generate_users
+
+RENTAL_DAYS = [1, 2, 3, 5, 7, 14, 30]  # the day options offered on each recommendation card
+
+
+def generate_data(args):
+    """Synthetic (cars, users, rentals) frames for the given sizes and seed."""
+    cars = generate_cars(args.cars, seed=args.seed)
+    users = generate_users(args.users, seed=args.seed)
+    rentals = generate_rentals(args.rentals, cars, args.users, seed=args.seed)
+    return cars, users, rentals
+
+
+def home_cities(rentals, n_users):
+    """City each user rents in (None for users without rentals), so returning users pick it as a real user would."""
+    cities = np.full(n_users, None, dtype=object)
+    first = rentals.drop_duplicates('user_id')
+    cities[first['user_id'].to_numpy()] = first['Pickup_Location'].astype(str).to_numpy()
+    return cities
+
+
+def start_app(args, cars, users, rentals):
+    """Serve the app on the given frames with a fake Stripe; return (server, base URL)."""
+    from werkzeug.serving import make_server
+    from benchmarks.fake_stripe import start_fake_stripe
+    from modules.data_sources import InMemoryDataSource
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    from app import create_app
+
+    data_source = InMemoryDataSource({'car': cars, 'user': users, 'rentals': rentals})
+
+    _, _, stripe_base = start_fake_stripe(latency=args.stripe_latency)
+    app = create_app({
+        'RECOMMENDER_WARMUP': 'eager',
+        'STRIPE_API_BASE': stripe_base,
+        'STRIPE_SECRET_KEY': 'sk_test_fake',
+        'STRIPE_PUBLIC_KEY': 'pk_test_fake',
+        'MAIL_SUPPRESS_SEND': True,
+        'MAIL_DEFAULT_SENDER': 'receipts@example.com',
+    }, data_source)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadgen-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Recorder:
+    """Collects (endpoint, seconds, outcome) samples from all virtual users."""
+
+    OUTCOMES = ('4xx', '5xx', 'failed')  # besides 'ok'
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.outcomes = defaultdict(lambda: dict.fromkeys(self.OUTCOMES, 0))
+        self.funnels = 0
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, outcome):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if outcome != 'ok':
+                self.outcomes[endpoint][outcome] += 1
+
+    def funnel_done(self):
+        with self._lock:
+            self.funnels += 1
+
+
+class VirtualUser:
+    """One browser session walking the booking funnel."""
+
+    def __init__(self, base_url, recorder, rng, args, cities):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.args = args
+        self.cities = cities
+        self.session = requests.Session()
+        self.etags = {}  # url -> (etag, body), as a browser cache would keep them
+
+    def request(self, endpoint, method, path, **kwargs):
+        """Send one request and record it under `endpoint`; returns the response or None on failure."""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(endpoint, time.perf_counter() - start, 'failed')
+            return None
+        status = response.status_code
+        outcome = 'ok' if status < 400 else '4xx' if status < 500 else '5xx'
+        self.recorder.add(endpoint, time.perf_counter() - start, outcome)
+        return response if status < 400 else None
+
+    def get_cached_json(self, endpoint, path):
+        """GET a catalog resource, revalidating a previously seen ETag."""
+        cached = self.etags.get(path)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = self.request(endpoint, 'GET', path, headers=headers)
+        if response is None:
+            return None
+        if response.status_code == 304 and cached:
+            return cached[1]
+        body = response.json()
+        if response.headers.get('ETag'):
+            self.etags[path] = (response.headers['ETag'], body)
+        return body
+
+    def run_funnel(self):
+        """Walk the funnel once; stop early (as the page would) when a step fails."""
+        self.request('GET /', 'GET', '/')
+        locations = (self.get_cached_json('GET /api/locations', '/api/locations') or {}).get('locations')
+        car_types = (self.get_cached_json('GET /api/car_types', '/api/car_types') or {}).get('car_types')
+        if not locations or not car_types:
+            return
+        location = locations[self.rng.integers(len(locations))]
+
+        if self.rng.random() < self.args.returning_ratio:
+            user = int(self.rng.integers(self.args.users))
+            name, email = f"user{user}", f"user{user}@example.com"
+            location = self.cities[user] or location
+        else:
+            name = f"loadtest-{uuid.uuid4().hex[:12]}"
+            email = f"{name}@example.com"
+
+        response = self.request('POST /api/check_user', 'POST', '/api/check_user',
+                                json={'name': name, 'email': email, 'location': location})
+        if response is None:
+            return
+        user = response.json()
+
+        recommendations = None
+        if user.get('user_exists'):
+            response = self.request('POST /api/collaborative_recommendations', 'POST',
+                                    '/api/collaborative_recommendations',
+                                    json={'user_id': user['user_id'], 'location': location})
+            if response is not None:
+                recommendations = response.json().get('recommendations')
+        if not recommendations:
+            # New users, and returning users whose CF request failed, fill in the preferences form.
+            # main.js reads AC / mileage with .checked on <select> elements, so they are never sent.
+            car_type = car_types[self.rng.integers(len(car_types))]
+            response = self.request('POST /api/content_recommendations', 'POST', '/api/content_recommendations',
+                                    json={'location': location, 'car_type': car_type,
+                                          'max_price': str(self.args.max_price),
+                                          'user_id': user.get('user_id')})
+            if response is None:
+                return
+            recommendations = response.json().get('recommendations')
+        if not recommendations:
+            return
+
+        car_id = recommendations[self.rng.integers(len(recommendations))]['id']
+        days = RENTAL_DAYS[self.rng.integers(len(RENTAL_DAYS))]
+        if self.request('GET /confirm_booking', 'GET', f'/confirm_booking/{car_id}?days={days}') is None:
+            return
+        if self.request('GET /payment', 'GET', f'/payment/{car_id}?days={days}') is None:
+            return
+
+        response = self.request('POST /create_payment_intent', 'POST', '/create_payment_intent',
+                                json={'car_id': str(car_id), 'rental_days': days})
+        if response is None:
+            return
+        client_secret = response.json()['clientSecret']
+        if self.request('POST /update_payment_intent', 'POST', '/update_payment_intent',
+                        json={'client_secret': client_secret, 'email': email}) is None:
+            return
+
+        # Card confirmation happens in Stripe.js; the fake server creates intents already succeeded
+        response = self.request('POST /process_payment', 'POST', '/process_payment',
+                                json={'payment_intent_id': client_secret.split('_secret_')[0], 'email': email})
+        if response is None:
+            return
+        self.request('GET /payment_success', 'GET', response.json()['redirect'])
+        self.recorder.funnel_done()
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            self.run_funnel()
+
+
+def run_level(base_url, concurrency, args, cities):
+    """Run `concurrency` virtual users for args.duration seconds; return (recorder, elapsed seconds)."""
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    users = [VirtualUser(base_url, recorder, np.random.default_rng([args.seed, concurrency, i]), args, cities)
+             for i in range(concurrency)]
+    threads = [threading.Thread(target=user.run, args=(deadline,), daemon=True) for user in users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+
+def report(recorder, elapsed, concurrency):
+    print(f"\nconcurrency {concurrency}: {recorder.funnels} funnels completed in {elapsed:.1f}s "
+          f"({recorder.funnels / elapsed:.1f} bookings/s)")
+    print(f"{'endpoint':<38} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'4xx':>7} {'5xx':>7} {'failed':>7}")
+    total = 0
+    totals = dict.fromkeys(Recorder.OUTCOMES, 0)
+    for endpoint, samples in recorder.samples.items():
+        latencies = np.array(samples) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        outcomes = recorder.outcomes[endpoint]
+        total += len(samples)
+        for outcome in totals:
+            totals[outcome] += outcomes[outcome]
+        rates = ' '.join(f"{outcomes[outcome] / len(samples):>7.1%}" for outcome in Recorder.OUTCOMES)
+        print(f"{endpoint:<38} {len(samples):>9} {len(samples) / elapsed:>8.1f} {p50:>8.1f} {p95:>8.1f} "
+              f"{p99:>8.1f} {latencies.max():>8.1f} {rates}")
+    if total:
+        rates = ' '.join(f"{totals[outcome] / total:>7.1%}" for outcome in Recorder.OUTCOMES)
+        print(f"{'all':<38} {total:>9} {total / elapsed:>8.1f} {'':>8} {'':>8} {'':>8} {'':>8} {rates}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="virtual users; one run per value")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument('--target', help="base URL of a running app serving the same synthetic data; "
+                                         "starts one in-process if omitted")
+    parser.add_argument('--cars', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--rentals', type=int, default=100_000)
+    parser.add_argument('--returning-ratio', type=float, default=0.5,
+                        help="share of funnels made by existing users (user<i>@example.com)")
+    parser.add_argument('--max-price', type=float, default=2000, help="max hourly price entered in the form")
+    parser.add_argument('--stripe-latency', type=float, default=0.05,
+                        help="seconds the fake Stripe API takes per call")
+    parser.add_argument('--timeout', type=float, default=30, help="client timeout per request")
+    parser.add_argument('--warmup', type=int, default=3, help="unrecorded funnels run before measuring")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cars, users, rentals = generate_data(args)
+    cities = home_cities(rentals, args.users)
+
+    server = None
+    base_url = args.target
+    if base_url is None:
+        start = time.perf_counter()
+        server, base_url = start_app(args, cars, users, rentals)
+        print(f"App serving {args.cars:,} cars, {args.users:,} users, {args.rentals:,} rentals on {base_url} "
+              f"(started in {time.perf_counter() - start:.1f}s, fake Stripe latency {args.stripe_latency * 1000:.0f} ms)")
+    base_url = base_url.rstrip('/')
+
+    try:
+        # First-use costs (SDK imports, connection setup) are not part of steady-state latency
+        warmup = VirtualUser(base_url, Recorder(), np.random.default_rng(args.seed), args, cities)
+        for _ in range(args.warmup):
+            warmup.run_funnel()
+
+        for concurrency in args.concurrency:
+            recorder, elapsed = run_level(base_url, concurrency, args, cities)
+            report(recorder, elapsed, concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
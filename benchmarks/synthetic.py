@@ -0,0 +1,158 @@
+"""
+Synthetic fleet, user and rental data matching the 'car', 'user' and 'rentals'
+collection schemas, for benchmarking without a database.
+
+Generation is vectorized and seeded, so the same arguments always produce the
+same frames.
+"""
+import numpy as np
+import pandas as pd
+
+CITIES = ["Ahmedabad", "Bangalore", "Chennai", "Delhi", "Goa", "Hyderabad",
+          "Jaipur", "Kolkata", "Mumbai", "Pune"]
+CAR_TYPES = ["SUV", "Sedan", "Hatchback", "Luxury"]
+MAKES = {
+    "Maruti": ["Swift", "Baleno", "Dzire", "Brezza", "Ertiga"],
+    "Hyundai": ["i20", "Verna", "Creta", "Venue", "Alcazar"],
+    "Tata": ["Nexon", "Harrier", "Altroz", "Tiago", "Safari"],
+    "Mahindra": ["XUV700", "Scorpio", "Thar", "XUV300", "Bolero"],
+    "Honda": ["City", "Amaze", "Elevate", "Jazz", "WR-V"],
+    "Toyota": ["Innova", "Fortuner", "Glanza", "Camry", "Hyryder"],
+    "Kia": ["Seltos", "Sonet", "Carens", "Carnival", "EV6"],
+    "BMW": ["3 Series", "5 Series", "X1", "X5", "i4"],
+    "Mercedes": ["C-Class", "E-Class", "GLA", "GLC", "S-Class"],
+}
+TRANSMISSIONS = ["Manual", "Automatic"]
+FUEL_POLICIES = ["Full to Full", "Same to Same", "Pre-purchase", "Free Tank"]
+AGENCIES = ["Zoomcar", "Revv", "Myles", "Avis", "Hertz", "Drivezy", "Savaari", "Carzonrent"]
+PRICE_RANGE = {"Hatchback": (80, 180), "Sedan": (120, 260), "SUV": (180, 400), "Luxury": (450, 1200)}
+
+
+def generate_cars(n_cars, seed=0):
+    """
+    Generate a car catalog shaped like the 'car' collection.
+
+    Args:
+        n_cars (int): Number of cars
+        seed (int, optional): RNG seed
+
+    Returns:
+        DataFrame: One row per car, Car_Id 0..n_cars-1
+    """
+    rng = np.random.default_rng(seed)
+    makes = np.array(list(MAKES))
+    make_idx = rng.integers(len(makes), size=n_cars)
+    model_idx = rng.integers(5, size=n_cars)
+    models = np.array([MAKES[m] for m in makes])[make_idx, model_idx]
+    car_type = np.array(CAR_TYPES)[rng.integers(len(CAR_TYPES), size=n_cars)]
+
+    low = np.array([PRICE_RANGE[t][0] for t in CAR_TYPES])
+    high = np.array([PRICE_RANGE[t][1] for t in CAR_TYPES])
+    type_idx = pd.Categorical(car_type, categories=CAR_TYPES).codes
+    price = np.round(rng.uniform(low[type_idx], high[type_idx]))
+
+    mileage = np.round(rng.uniform(8, 25, size=n_cars), 1)
+    mileage[rng.random(n_cars) < 0.02] = np.nan
+    image = np.char.add("https://example.com/cars/", np.arange(n_cars).astype(str)).astype(object)
+    image[rng.random(n_cars) < 0.1] = np.nan
+
+    return pd.DataFrame({
+        "Car_Id": np.arange(n_cars),
+        "Make": makes[make_idx],
+        "Model": models,
+        "Car Type": car_type,
+        "Transmission": np.array(TRANSMISSIONS)[rng.integers(2, size=n_cars)],
+        "Fuel Policy": np.array(FUEL_POLICIES)[rng.integers(len(FUEL_POLICIES), size=n_cars)],
+        "Price per Hour (INR)": price,
+        "Rating": np.round(rng.uniform(2.5, 5.0, size=n_cars), 1),
+        "Mileage (km/l)": mileage,
+        "Occupancy": rng.choice([4, 5, 7], size=n_cars),
+        "AC": np.where(rng.random(n_cars) < 0.85, "Yes", "No"),
+        "Umlimited Mileage": np.where(rng.random(n_cars) < 0.5, "Yes", "No"),
+        "Luggage Capacity": rng.integers(1, 6, size=n_cars),
+        "Agency_Name": np.array(AGENCIES)[rng.integers(len(AGENCIES), size=n_cars)],
+        "Base_Fare": np.round(price * rng.uniform(2, 4, size=n_cars)),
+        "Image_URL": image,
+        "City": np.array(CITIES)[rng.integers(len(CITIES), size=n_cars)],
+    })
+
+
+def generate_users(n_users, seed=0):
+    """
+    Generate users shaped like the 'user' collection.
+
+    Returns:
+        DataFrame: One row per user, user_id 0..n_users-1
+    """
+    rng = np.random.default_rng(seed + 1)
+    ids = np.arange(n_users)
+    names = np.char.add("user", ids.astype(str))
+    return pd.DataFrame({
+        "user_id": ids,
+        "name": names,
+        "email": np.char.add(names, "@example.com"),
+        "gender": rng.choice(["male", "female"], size=n_users),
+        "age": rng.integers(18, 70, size=n_users),
+    })
+
+
+def generate_rentals(n_rentals, cars, n_users, seed=0, with_dates=False):
+    """
+    Generate rentals shaped like the 'rentals' collection.
+
+    Each user has a home city and rents cars there. Popularity is skewed
+    towards a few users and a few cars per city, as in real rental history.
+
+    Args:
+        n_rentals (int): Number of rentals
+        cars (DataFrame): Catalog from generate_cars
+        n_users (int): Number of distinct users
+        seed (int, optional): RNG seed
+        with_dates (bool, optional): Also generate the formatted rental_date /
+            return_date strings. These are not used by the recommender and are
+            slow to build for millions of rows.
+
+    Returns:
+        DataFrame: One row per rental, travelCode 0..n_rentals-1
+    """
+    rng = np.random.default_rng(seed + 2)
+
+    # Cars grouped by city so a rental can pick within its user's city
+    city_codes = pd.Categorical(cars["City"], categories=CITIES).codes
+    order = np.argsort(city_codes, kind="stable")
+    city_counts = np.bincount(city_codes, minlength=len(CITIES))
+    city_starts = np.concatenate([[0], np.cumsum(city_counts)[:-1]])
+    car_ids_by_city = cars["Car_Id"].to_numpy()[order]
+
+    # Only cities that actually have cars can be a user's home
+    stocked = np.flatnonzero(city_counts)
+    user_city = stocked[rng.integers(len(stocked), size=n_users)]
+
+    user_id = (n_users * rng.random(n_rentals) ** 2).astype(np.int64)
+    city = user_city[user_id]
+    pick = (city_counts[city] * rng.random(n_rentals) ** 1.5).astype(np.int64)
+    car_id = car_ids_by_city[city_starts[city] + pick]
+
+    days = rng.choice([1, 2, 3, 5, 7, 14, 30], p=[0.3, 0.2, 0.15, 0.15, 0.1, 0.06, 0.04], size=n_rentals)
+    price_per_hour = cars["Price per Hour (INR)"].to_numpy()[car_id]
+    duration_hours = days * 24
+
+    rentals = pd.DataFrame({
+        "user_id": user_id,
+        "Pickup_Location": pd.Categorical.from_codes(city, categories=CITIES),
+        "duration": days,
+        "Car_Id": car_id,
+        "total_amount": (price_per_hour * duration_hours).astype(np.int64),
+        "Duration_Hours": duration_hours,
+        "Total_Minutes": duration_hours * 60,
+        "Days": days,
+        "Hours": 0,
+        "Duration_Days": days,
+        "travelCode": np.arange(n_rentals),
+    })
+    if with_dates:
+        start = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, size=n_rentals), unit="min")
+        rentals["rental_date"] = start.strftime("%d-%m-%Y %H:%M")
+        rentals["return_date"] = (start + pd.to_timedelta(days, unit="D")).strftime("%d-%m-%Y %H:%M")
+        rentals["Formatted_Duration"] = pd.Series(days).astype(str) + " days 0 hours"
+    return rentals
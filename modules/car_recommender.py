@@ -1,72 +1,199 @@
+import logging
 import os
+import threading
 import pandas as pd
 import numpy as np
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from collections import defaultdict
-from dotenv import load_dotenv
+from modules.catalog import Catalog, content_hash
+from modules.data_sources import InMemoryDataSource, create_data_source
+from modules.features import LinearReranker, RentalFeatures
+from modules.metrics import metrics
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Collaborative filtering backends: item-item cosine over the city's rental counts,
+# or implicit-feedback matrix factorization (see matrix_factorization.ImplicitALS)
+CF_BACKENDS = ('item_cosine', 'als')
+
+class _PipelineState(threading.local):
+    """Per-thread state of the multi-step content pipeline, so concurrent requests don't share it."""
+    catalog = None
+    filtered_cars = None
+    similarity_matrix = None
 
 class CarRecommendationSystem:
-    def __init__(self):
-        """Initialize database connection and load data."""
-        self.client = self.connect_to_db()
-        self.db = self.client['tripglide'] if self.client else None
-        self.car_df = self.fetch_data_from_db('car')
+    def __init__(self, data_source=None, car_df=None, rental_df=None, cf_backend=None, als_model=None):
+        """
+        Initialize the data source and load data.
+
+        Args:
+            data_source (DataSource, optional): Where to read cars and rentals from and
+                write new users and rentals to. Defaults to the source selected by the
+                DATA_SOURCE environment variable (see data_sources.create_data_source).
+            car_df (DataFrame, optional): Shorthand for an in-memory source with this car catalog.
+            rental_df (DataFrame, optional): Rentals for the in-memory source built from car_df.
+            cf_backend (str, optional): 'item_cosine' or 'als'. Defaults to the CF_BACKEND
+                environment variable, then 'item_cosine'.
+            als_model (ImplicitALS, optional): Trained model for the 'als' backend. Defaults to
+                the model saved at ALS_MODEL_PATH; without one the 'item_cosine' backend is used.
+        """
+        if data_source is None:
+            if car_df is not None:
+                data_source = InMemoryDataSource({
+                    'car': car_df,
+                    'rentals': rental_df if rental_df is not None else pd.DataFrame(),
+                })
+            else:
+                data_source = create_data_source()
+        self.data_source = data_source
+        self.client = data_source.client
+        self.db = data_source.db
+        # The catalog is replaced wholesale by reload_catalog(); readers take one reference per request
+        self.catalog = Catalog(self.fetch_data_from_db('car'))
         self.rental_df = self.fetch_data_from_db('rentals')
-        self.filtered_cars = None
-        self.similarity_matrix = None
+        self.cf_backend = (cf_backend or os.getenv('CF_BACKEND', 'item_cosine')).lower()
+        if self.cf_backend not in CF_BACKENDS:
+            raise ValueError(f"Unknown CF backend '{self.cf_backend}'. Choose from {', '.join(CF_BACKENDS)}.")
+        self.als_model = als_model
+        if self.cf_backend == 'als' and self.als_model is None:
+            self.als_model = self.load_als_model()
+            if self.als_model is None:
+                self.cf_backend = 'item_cosine'
+        # Re-ranks both pipelines' candidates using rental-history features; RERANK_ENABLED=false turns it off
+        self.reranker = None
+        if os.getenv('RERANK_ENABLED', 'true').lower() in ('1', 'true', 'yes'):
+            self.reranker = LinearReranker(RentalFeatures(self.rental_df))
+        self._state = _PipelineState()
+        self._reload_lock = threading.Lock()
+        self._reload_stop = threading.Event()
+        self.warmed_up = False
+
+    def load_als_model(self):
+        """
+        Load the ALS model saved at ALS_MODEL_PATH, or return None if there is none.
 
-    def connect_to_db(self):
-        """Establish connection to MongoDB database."""
-        try:
-            # Get MongoDB connection string from environment variables
-            mongo_uri = os.getenv('MONGO_URI')
-            client = MongoClient(mongo_uri)
-            # Ping the server to verify connection
-            client.admin.command('ping')
-            print("Connected successfully to MongoDB")
-            return client
-        except ConnectionFailure as e:
-            print(f"Database connection failed: {e}")
+        The model is trained offline (`python -m modules.matrix_factorization`);
+        training inside a serving process would hold the GIL for minutes per
+        worker on a large rental history.
+        """
+        model_path = os.getenv('ALS_MODEL_PATH')
+        if not model_path or not os.path.exists(model_path):
+            logger.warning(f"CF_BACKEND=als but no saved model at ALS_MODEL_PATH ({model_path or 'unset'}); "
+                           f"using item_cosine. Train one with `python -m modules.matrix_factorization <path>`.")
             return None
+        # Imported here so the default backend doesn't load SciPy at startup
+        from modules.matrix_factorization import ImplicitALS
+        logger.info(f"Loading ALS model from {model_path}")
+        return ImplicitALS.load(model_path)
 
+    @property
+    def car_df(self):
+        return self.catalog.car_df
+
+    @property
+    def filtered_cars(self):
+        return self._state.filtered_cars
+
+    @filtered_cars.setter
+    def filtered_cars(self, value):
+        self._state.filtered_cars = value
+
+    @property
+    def similarity_matrix(self):
+        return self._state.similarity_matrix
+
+    @similarity_matrix.setter
+    def similarity_matrix(self, value):
+        self._state.similarity_matrix = value
+
+    def _pinned_catalog(self):
+        """The catalog the current thread's pipeline started on (the live one if none)."""
+        catalog = self._state.catalog
+        return catalog if catalog is not None else self.catalog
+
+    def reset_pipeline(self):
+        """
+        Drop the current thread's pinned catalog and intermediate results.
+
+        Call once a request is done with them, so long-lived worker threads
+        don't keep a replaced catalog and its similarity matrix alive.
+        """
+        state = self._state
+        state.catalog = state.filtered_cars = state.similarity_matrix = None
+
+    def reload_catalog(self):
+        """
+        Reload the car collection and swap in a new catalog if it changed.
+
+        The new catalog (details, JSON fragments, TF-IDF index, lookups) is built
+        entirely before the single reference assignment that publishes it, so
+        requests never see a partially built catalog and never wait on a lock.
+
+        Returns:
+            bool: True if a new catalog was swapped in
+        """
+        with self._reload_lock:
+            car_df = self.fetch_data_from_db('car')
+            if car_df.empty and not self.catalog.car_df.empty:
+                logger.warning("Catalog reload returned no cars; keeping the current catalog")
+                return False
+            version = content_hash(car_df.reset_index(drop=True))
+            if version == self.catalog.version:
+                return False
+            catalog = Catalog(car_df, version=version)
+            self.catalog = catalog
+            metrics.inc('catalog_reloads_total')
+            logger.info(f"Catalog reloaded: {len(catalog)} cars, version {version[:12]}")
+            return True
+
+    def start_catalog_reloader(self, interval):
+        """Reload the catalog every `interval` seconds on a daemon thread until stop_catalog_reloader()."""
+        def run():
+            while not self._reload_stop.wait(interval):
+                try:
+                    self.reload_catalog()
+                except Exception:
+                    logger.exception("Catalog reload failed")
+
+        self._reload_stop.clear()
+        thread = threading.Thread(target=run, name='catalog-reloader', daemon=True)
+        thread.start()
+        return thread
+
+    def stop_catalog_reloader(self):
+        self._reload_stop.set()
 
     def fetch_data_from_db(self, collection_name):
         """Retrieve data from the specified collection."""
-        try:
-            if self.client is None:
-                return pd.DataFrame()
-                
-            # Get all documents from the collection
-            collection = self.client['tripglide'][collection_name]
-            cursor = collection.find({})
-            
-            # Convert MongoDB cursor to DataFrame
-            df = pd.DataFrame(list(cursor))
-            
-            
-            # Convert MongoDB _id to string if present
-            if '_id' in df.columns:
-                df['_id'] = df['_id'].astype(str)
-                
-            return df
-        except OperationFailure as e:
-            print(f"Failed to fetch data from {collection_name}: {e}")
-            return pd.DataFrame()
-# print(df)
+        return self.data_source.load(collection_name)
+
+    def warm_up(self):
+        """Import the model libraries and touch lookup tables ahead of the first request."""
+        # scikit-learn is imported lazily by the similarity methods; pay for it here instead
+        from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: F401
+        from sklearn.metrics.pairwise import cosine_similarity  # noqa: F401
+        self.get_valid_locations()
+        self.get_valid_car_types()
+        self.warmed_up = True
+
+    def index_status(self):
+        """Sizes of the loaded data and whether indexes are built, for readiness checks."""
+        return {
+            "cars": len(self.car_df),
+            "rentals": len(self.rental_df),
+            "indexes_hot": self.warmed_up,
+            "catalog_version": self.catalog.version,
+            "db_indexes": self.data_source.indexes,
+        }
+
     def check_user_exists(self, name, email, location):
         """Check if the user exists in the database and return their user_id if found."""
         try:
             # First, check if the user exists in the users collection
-            if self.client is None:
+            if not self.data_source.available:
                 return {"exists": False, "error": "Database connection not available"}
             
-            users_collection = self.client['tripglide']['user']
-            user = users_collection.find_one({"name": name, "email": email})
+            user = self.data_source.find_user(name, email)
             
             if not user:
                 return {"exists": False, "user_id": None}
@@ -87,33 +214,40 @@ class CarRecommendationSystem:
             }
             
         except Exception as e:
-            print(f"Error checking user: {e}")
+            logger.error(f"Error checking user: {e}")
             return {"exists": False, "error": str(e)}
 
     def get_valid_locations(self):
         """Get list of valid locations from the database."""
-        if self.car_df.empty:
-            return []
-        return sorted(self.car_df['City'].unique().tolist())
+        return list(self.catalog.locations)
 
     def get_valid_car_types(self):
         """Get list of valid car types from the database."""
-        if self.car_df.empty:
-            return ["SUV", "Sedan", "Hatchback", "Luxury"]
-        return sorted(self.car_df['Car Type'].unique().tolist())
+        return list(self.catalog.car_types)
 
     # Content-Based Filtering Methods
     def filter_by_location(self, user_city):
         """Filter cars based on user location."""
-        valid_cities = set(self.car_df["City"].str.lower().unique())
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='location_filter'):
+            return self._filter_by_location(user_city)
+
+    def _filter_by_location(self, user_city):
+        # Pin the catalog for the rest of this pipeline, so a concurrent reload can't mix snapshots
+        self._state.catalog = catalog = self.catalog
+        car_df = catalog.car_df
+        valid_cities = set(car_df["City"].str.lower().unique())
         if user_city.lower() not in valid_cities:
             return {"error": "Invalid Pickup Location. Please enter a valid city from the database."}
         
-        self.filtered_cars = self.car_df[self.car_df["City"].str.lower() == user_city.lower()]
+        self.filtered_cars = car_df[car_df["City"].str.lower() == user_city.lower()]
         return {"success": True, "count": len(self.filtered_cars)}
 
     def apply_user_preferences(self, preferred_type=None, max_price=None, ac_required=None, unlimited_mileage=None):
         """Filter cars based on user preferences."""
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='preference_filter'):
+            return self._apply_user_preferences(preferred_type, max_price, ac_required, unlimited_mileage)
+
+    def _apply_user_preferences(self, preferred_type, max_price, ac_required, unlimited_mileage):
         if self.filtered_cars is None or self.filtered_cars.empty:
             return {"error": "No cars available for filtering."}
             
@@ -123,9 +257,10 @@ class CarRecommendationSystem:
         ac_required = ac_required.strip().lower() if ac_required else "yes"
         unlimited_mileage = unlimited_mileage.strip().lower() if unlimited_mileage else "yes"
 
-        valid_types = set(self.car_df["Car Type"].str.lower().unique())
+        catalog = self._pinned_catalog()
+        valid_types = set(catalog.car_df["Car Type"].str.lower().unique())
         if preferred_type.lower() not in valid_types:
-            return {"error": f"Invalid Car Type. Choose from {', '.join(self.get_valid_car_types())}."}
+            return {"error": f"Invalid Car Type. Choose from {', '.join(catalog.car_types)}."}
         
         try:
             max_price = float(max_price)
@@ -133,7 +268,7 @@ class CarRecommendationSystem:
             return {"error": "Invalid price input. Please enter a numeric value."}
 
         # Get the minimum price in the dataset
-        min_price = self.car_df["Price per Hour (INR)"].min()
+        min_price = catalog.car_df["Price per Hour (INR)"].min()
 
         if max_price < min_price:
             return {"error": f"No cars available under ₹{max_price}/hour. The lowest price available is ₹{min_price}/hour."}
@@ -162,23 +297,33 @@ class CarRecommendationSystem:
         if self.filtered_cars is None or self.filtered_cars.empty:
             return {"error": "No cars available for computing similarity."}
             
-        features = ["Make", "Model", "Car Type", "Transmission", "Fuel Policy"]
-
-        # Ensure a copy to avoid `SettingWithCopyWarning`
-        self.filtered_cars = self.filtered_cars.copy()
+        from sklearn.metrics.pairwise import cosine_similarity
 
-        # Fill missing values
-        self.filtered_cars.loc[:, features] = self.filtered_cars[features].fillna("Unknown")
-        self.filtered_cars["combined_features"] = self.filtered_cars[features].agg(" ".join, axis=1)
+        catalog = self._pinned_catalog()
+        if catalog.feature_index is None:
+            return {"error": "No cars available for computing similarity."}
 
-        vectorizer = TfidfVectorizer()
-        feature_vectors = vectorizer.fit_transform(self.filtered_cars["combined_features"])
-        self.similarity_matrix = cosine_similarity(feature_vectors)
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='tfidf'):
+            # Rows of the catalog's TF-IDF index; filtered_cars keeps the catalog's 0..n-1 labels
+            feature_vectors = catalog.feature_index[self.filtered_cars.index.to_numpy()]
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='similarity'):
+            self.similarity_matrix = cosine_similarity(feature_vectors)
         
         return {"success": True}
 
-    def recommend_similar_cars(self):
+    def recommend_similar_cars(self, user_id=None):
         """Recommend cars similar to the highest-rated car in the filtered list, ensuring diverse makes."""
+        car_ids = self.recommend_similar_car_ids(user_id)
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='details'):
+            return self._pinned_catalog().get_many(car_ids)
+
+    def recommend_similar_car_ids(self, user_id=None):
+        """
+        Car_Ids chosen by recommend_similar_cars, without building their details.
+
+        Args:
+            user_id (optional): Known user, whose rental history personalises the re-ranking
+        """
         if self.filtered_cars is None or self.filtered_cars.empty or self.similarity_matrix is None:
             return []
             
@@ -191,6 +336,17 @@ class CarRecommendationSystem:
         similarity_scores = self.similarity_matrix[selected_car_index]
         similar_car_indices = np.argsort(similarity_scores)[::-1][1:41]  # Consider top 40 cars for diversity
 
+        if self.reranker is not None:
+            with metrics.timer('recommender_stage_seconds', pipeline='content', stage='rerank'):
+                order = self.reranker.order(self.filtered_cars.iloc[similar_car_indices],
+                                            similarity_scores[similar_car_indices], user_id)
+                similar_car_indices = similar_car_indices[order]
+
+        with metrics.timer('recommender_stage_seconds', pipeline='content', stage='diversity'):
+            return self._diversify_by_make(similar_car_indices)
+
+    def _diversify_by_make(self, similar_car_indices):
+        """Pick up to 5 of the similar cars, preferring one per Make."""
         # Step 1: Group cars by Make
         make_groups = {}  
         for idx in similar_car_indices:
@@ -229,12 +385,15 @@ class CarRecommendationSystem:
 
             recommended_cars.extend(additional_cars[: 5 - len(recommended_cars)])
             
-        car_ids = [int(car["Car_Id"]) for car in recommended_cars]  # Convert NumPy int64 to Python int
-        return self.get_car_details(car_ids)
+        return [int(car["Car_Id"]) for car in recommended_cars]  # Convert NumPy int64 to Python int
 
     # Collaborative Filtering Methods
     def create_user_car_matrix(self, selected_location):
         """Create a user-car matrix for collaborative filtering."""
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='pivot'):
+            return self._create_user_car_matrix(selected_location)
+
+    def _create_user_car_matrix(self, selected_location):
         if self.rental_df.empty:
             return None
             
@@ -258,11 +417,26 @@ class CarRecommendationSystem:
         if user_car_matrix is None or user_car_matrix.empty:
             return None
 
-        item_similarity = cosine_similarity(user_car_matrix.T)
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='similarity'):
+            item_similarity = cosine_similarity(user_car_matrix.T)
         return pd.DataFrame(item_similarity, index=user_car_matrix.columns, columns=user_car_matrix.columns)
 
     def recommend_cf_cars(self, user_id, selected_location):
         """Recommend cars using collaborative filtering."""
+        car_ids = self.recommend_cf_car_ids(user_id, selected_location)
+        if isinstance(car_ids, dict):
+            return car_ids
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='details'):
+            return self._pinned_catalog().get_many(car_ids)
+
+    def recommend_cf_car_ids(self, user_id, selected_location):
+        """Car_Ids chosen by recommend_cf_cars, or an error dict."""
+        self._state.catalog = self.catalog
+        if self.cf_backend == 'als':
+            return self._recommend_als_car_ids(user_id, selected_location)
+
         user_car_matrix = self.create_user_car_matrix(selected_location)
         if user_car_matrix is None:
             return {"error": "No data available for the selected location."}
@@ -274,6 +448,14 @@ class CarRecommendationSystem:
         if int(user_id) not in user_car_matrix.index:
             return {"error": "User not found in the selected location."}
 
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='ranking'):
+            displayed_cars = self._rank_cf_cars(user_id, user_car_matrix, item_sim_df)
+        if displayed_cars is None:
+            return {"error": "No recommendations available based on user history."}
+        return displayed_cars
+
+    def _rank_cf_cars(self, user_id, user_car_matrix, item_sim_df):
+        """Pick up to 5 cars similar to the user's rentals, preferring one per agency; None if there are no candidates."""
         rented_cars = user_car_matrix.loc[int(user_id)]
         rented_cars = rented_cars[rented_cars > 0].index.tolist()
         recommended_cars = []
@@ -286,11 +468,56 @@ class CarRecommendationSystem:
         recommended_cars = list(set(recommended_cars) - set(rented_cars))  # Remove already rented cars
 
         if not recommended_cars:
-            return {"error": "No recommendations available based on user history."}
+            return None
 
         # Filter recommendations from car_table
-        recommended_car_details = self.car_df[self.car_df["Car_Id"].isin(recommended_cars)].copy()
+        car_df = self._pinned_catalog().car_df
+        recommended_car_details = car_df[car_df["Car_Id"].isin(recommended_cars)].copy()
+
+        if self.reranker is not None and not recommended_car_details.empty:
+            with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='rerank'):
+                # Base score: highest similarity to any car the user has rented
+                base_scores = item_sim_df.loc[rented_cars, recommended_car_details["Car_Id"]].max(axis=0).to_numpy()
+                order = self.reranker.order(recommended_car_details, base_scores, user_id)
+                recommended_car_details = recommended_car_details.iloc[order]
+
+        return self._diversify_by_agency(recommended_car_details)
+
+    def _recommend_als_car_ids(self, user_id, selected_location):
+        """Car_Ids from the ALS model: score the city's cars for the user, then diversify by agency."""
+        if self.als_model is None:
+            return {"error": "No data available for the selected location."}
+
+        catalog = self._pinned_catalog()
+        candidates = catalog.car_ids_by_city.get(selected_location.lower())
+        if candidates is None:
+            return {"error": "No data available for the selected location."}
+        if not self.als_model.has_user(int(user_id)):
+            return {"error": "User not found in the selected location."}
 
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='scoring'):
+            scored = self.als_model.recommend(int(user_id), k=40, candidates=candidates)
+        if not scored:
+            return {"error": "No recommendations available based on user history."}
+
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='ranking'):
+            rank = {car_id: position for position, (car_id, _) in enumerate(scored)}
+            car_df = catalog.car_df
+            recommended_car_details = car_df[car_df["Car_Id"].isin(rank)]
+            order = recommended_car_details["Car_Id"].map(rank).to_numpy().argsort(kind="stable")
+            recommended_car_details = recommended_car_details.iloc[order]
+
+        if self.reranker is not None and not recommended_car_details.empty:
+            with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='rerank'):
+                base_scores = recommended_car_details["Car_Id"].map(dict(scored)).to_numpy()
+                order = self.reranker.order(recommended_car_details, base_scores, user_id)
+                recommended_car_details = recommended_car_details.iloc[order]
+
+        with metrics.timer('recommender_stage_seconds', pipeline='collaborative', stage='diversity'):
+            return self._diversify_by_agency(recommended_car_details)
+
+    def _diversify_by_agency(self, recommended_car_details):
+        """Pick up to 5 of the candidate cars, in the frame's order, preferring one per agency."""
         # Group by Agency
         agency_groups = defaultdict(list)
         for _, row in recommended_car_details.iterrows():
@@ -315,61 +542,25 @@ class CarRecommendationSystem:
             additional_cars = additional_cars.sort_values("Rating", ascending=False)
             displayed_cars.extend([int(car_id) for car_id in additional_cars["Car_Id"].tolist()[:5 - len(displayed_cars)]])
 
-        return self.get_car_details(displayed_cars)
+        return displayed_cars
 
     def get_car_details(self, car_id):
         """Get detailed information about a specified car or list of cars."""
         # Check if car_id is a list or a single value
         if isinstance(car_id, list):
-            # Handle list of car IDs
-            car_details = []
-            for cid in car_id:
-                car = self.car_df[self.car_df["Car_Id"] == cid]
-                if not car.empty:
-                    car = car.iloc[0]
-                    car_details.append({
-                        "id": int(car["Car_Id"]),
-                        "name": f"{car['Model']}",
-                        "car_type": car["Car Type"],
-                        "fuel_policy": car["Fuel Policy"],
-                        "transmission": car["Transmission"],
-                        "price_per_hour": float(car["Price per Hour (INR)"]),
-                        "price_per_day": float(car["Price per Hour (INR)"]) * 24,
-                        "rating": float(car["Rating"]),
-                        "mileage_kmpl": float(car["Mileage (km/l)"]) if not pd.isna(car["Mileage (km/l)"]) else 0,
-                        "occupancy": int(car["Occupancy"]) if not pd.isna(car["Occupancy"]) else 0,
-                        "ac": car["AC"],
-                        "unlimited_mileage": car.get("Umlimited Mileage", 0),
-                        "luggage_capacity": int(car["Luggage Capacity"]),
-                        "agency_name": car["Agency_Name"],
-                        "base_fare": float(car["Base_Fare"]) if not pd.isna(car["Base_Fare"]) else 0,
-                        "image_url": car["Image_URL"] if not pd.isna(car["Image_URL"]) else "",
-                    })
-            return car_details
-        else:
-            # Handle single car ID
-            car = self.car_df[self.car_df["Car_Id"] == car_id]
-            if not car.empty:
-                car = car.iloc[0]
-                return {
-                    "id": int(car["Car_Id"]),
-                    "name": f"{car['Model']}",
-                    "car_type": car["Car Type"],
-                    "fuel_policy": car["Fuel Policy"],
-                    "transmission": car["Transmission"],
-                    "price_per_hour": float(car["Price per Hour (INR)"]),
-                    "price_per_day": float(car["Price per Hour (INR)"]) * 24,
-                    "rating": float(car["Rating"]),
-                    "mileage_kmpl": float(car["Mileage (km/l)"]) if not pd.isna(car["Mileage (km/l)"]) else 0,
-                    "occupancy": int(car["Occupancy"]) if not pd.isna(car["Occupancy"]) else 0,
-                    "ac": car["AC"],
-                    "unlimited_mileage": car.get("Umlimited Mileage", 0),
-                    "luggage_capacity": int(car["Luggage Capacity"]),
-                    "agency_name": car["Agency_Name"],
-                    "base_fare": float(car["Base_Fare"]) if not pd.isna(car["Base_Fare"]) else 0,
-                    "image_url": car["Image_URL"] if not pd.isna(car["Image_URL"]) else "",
-                }
-            return None
+            return self.catalog.get_many(car_id)
+        return self.catalog.get(car_id)
+
+    def render_car_details(self, car_ids):
+        """
+        Render the details of a list of cars as a JSON array, from the catalog
+        this thread's last recommendation was computed against.
+
+        Returns:
+            tuple: (bytes, number of cars rendered)
+        """
+        return self._pinned_catalog().render_many(car_ids)
+
     def create_new_user(self, name, email, gender='unknown', age=30):
         """
         Create a new user in the database.
@@ -384,30 +575,21 @@ class CarRecommendationSystem:
             int: The newly created user_id
         """
         try:
-            # Get the next available user_id
-            max_user_id = self.db['users'].find_one(sort=[("user_id", -1)])
-            
-            if max_user_id:
-                new_user_id = max_user_id['user_id'] + 1
-            else:
-                new_user_id = 0
-                
             # Create new user document
             new_user = {
-                'user_id': new_user_id,
                 'name': name,
                 'gender': gender,
                 'age': age,
                 'email': email
             }
             
-            # Insert into database
-            self.db['users'].insert_one(new_user)
-            print("details added:",new_user)
+            # Insert into database under the next available user_id
+            new_user_id = self.data_source.insert_with_next_id('users', 'user_id', new_user)
+            logger.info("Created user %s", new_user_id)
             return new_user_id
             
         except Exception as e:
-            print(f"Error creating new user: {str(e)}")
+            logger.error(f"Error creating new user: {str(e)}")
             return None
 
     def get_last_travel_code(self):
@@ -419,14 +601,14 @@ class CarRecommendationSystem:
         """
         try:
             # Get the max travel code
-            max_travel = self.db['rentals'].find_one(sort=[("travelCode", -1)])
+            max_travel = self.data_source.max_value('rentals', 'travelCode')
             
-            if max_travel:
-                return max_travel['travelCode']
+            if max_travel is not None:
+                return int(max_travel)
             return 0
             
         except Exception as e:
-            print(f"Error getting last travel code: {str(e)}")
+            logger.error(f"Error getting last travel code: {str(e)}")
             return None
 
     def record_rental(self, rental_data):
@@ -437,28 +619,18 @@ class CarRecommendationSystem:
             rental_data (dict): The rental information
             
         Returns:
-            bool: True if successful, False otherwise
+            int: The rental's travel code, or None if it could not be saved
         """
         try:
-            # Get the next available travel code
-            max_travel = self.db['rentals'].find_one(sort=[("travelCode", -1)])
-            
-            if max_travel:
-                new_travel_code = max_travel['travelCode'] + 1
-            else:
-                new_travel_code = 0
-                
-            # Add travel code to rental data
-            rental_data['travelCode'] = new_travel_code
-            print("rental_data to be added:",rental_data)
-            # Insert into database
-            self.db['rentals'].insert_one(rental_data)
-            
-            return True
+            # Insert into database under the next available travel code
+            travel_code = self.data_source.insert_with_next_id('rentals', 'travelCode', rental_data)
+            logger.debug("Recorded rental %s for user %s, car %s",
+                         travel_code, rental_data.get('user_id'), rental_data.get('Car_Id'))
+            return travel_code
             
         except Exception as e:
-            print(f"Error recording rental: {str(e)}")
-            return False    
+            logger.error(f"Error recording rental: {str(e)}")
+            return None
 
 # Car = CarRecommendationSystem()
 # car_data = Car.fetch_data_from_db('car')
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+
+def numeric_column(frame, column):
+    """Column as a float array, with unparseable values (or a missing column) as NaN."""
+    if column not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=float)
+
+
+def _numeric(car_df, column, cast, default=0):
+    """Column as Python numbers, with missing values (or a missing column) replaced by `default`."""
+    values = numeric_column(car_df, column)
+    return [default if missing else cast(v) for v, missing in zip(values.tolist(), np.isnan(values).tolist())]
+
+
+def _raw(car_df, column, default=None):
+    """Column values as Python objects (NumPy scalars unboxed)."""
+    if column not in car_df.columns:
+        return [default] * len(car_df)
+    return car_df[column].tolist()
+
+
+def build_car_details(car_df):
+    """
+    Build the detail dict served for every car in the catalog.
+
+    Produces the same fields and types as the former per-request conversion in
+    get_car_details, but column-wise over the whole catalog.
+
+    Returns:
+        dict: Car_Id -> detail dict; for duplicate ids the first row wins
+    """
+    if car_df.empty:
+        return {}
+    car_df = car_df.drop_duplicates(subset="Car_Id", keep="first")
+    price_per_hour = _numeric(car_df, "Price per Hour (INR)", float)
+    columns = {
+        "id": _numeric(car_df, "Car_Id", int),
+        "name": [f"{model}" for model in _raw(car_df, "Model")],
+        "car_type": _raw(car_df, "Car Type"),
+        "fuel_policy": _raw(car_df, "Fuel Policy"),
+        "transmission": _raw(car_df, "Transmission"),
+        "price_per_hour": price_per_hour,
+        "price_per_day": [price * 24 for price in price_per_hour],
+        "rating": _numeric(car_df, "Rating", float),
+        "mileage_kmpl": _numeric(car_df, "Mileage (km/l)", float),
+        "occupancy": _numeric(car_df, "Occupancy", int),
+        "ac": _raw(car_df, "AC"),
+        "unlimited_mileage": _raw(car_df, "Umlimited Mileage", 0),
+        "luggage_capacity": _numeric(car_df, "Luggage Capacity", int),
+        "agency_name": _raw(car_df, "Agency_Name"),
+        "base_fare": _numeric(car_df, "Base_Fare", float),
+        "image_url": ["" if pd.isna(url) else url for url in _raw(car_df, "Image_URL", "")],
+    }
+    names = list(columns)
+    return {row[0]: dict(zip(names, row)) for row in zip(*columns.values())}
+
+
+# Text features the content-based recommender compares cars on
+SIMILARITY_FEATURES = ["Make", "Model", "Car Type", "Transmission", "Fuel Policy"]
+
+# Returned when the catalog is empty so the preferences form still has options
+DEFAULT_CAR_TYPES = ["SUV", "Sedan", "Hatchback", "Luxury"]
+
+
+def content_hash(car_df):
+    """Stable hex digest of the catalog's columns and values."""
+    digest = hashlib.sha256("\x1f".join(map(str, car_df.columns)).encode())
+    try:
+        row_hashes = pd.util.hash_pandas_object(car_df, index=False)
+    except TypeError:
+        # Unhashable cell values (e.g. nested documents); hash their string form instead
+        row_hashes = pd.util.hash_pandas_object(car_df.astype(str), index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def build_feature_index(car_df):
+    """
+    Fit TF-IDF over every car's combined text features.
+
+    Returns:
+        sparse matrix: One L2-normalised row per car_df row, or None for an empty catalog
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    columns = [car_df[feature].fillna("Unknown").astype(str) for feature in SIMILARITY_FEATURES
+               if feature in car_df.columns]
+    if car_df.empty or not columns:
+        return None
+    combined = columns[0].str.cat(columns[1:], sep=" ")
+    try:
+        return TfidfVectorizer().fit_transform(combined)
+    except ValueError:
+        # Empty vocabulary, e.g. every feature missing
+        return None
+
+
+class Catalog:
+    """
+    Immutable snapshot of the car collection prepared for serving.
+
+    Holds the car DataFrame (re-indexed 0..n-1), the TF-IDF feature index whose
+    rows line up with it, and the lookup tables below. A catalog is never
+    modified after construction: a reload builds a new one and swaps the
+    reference, so readers holding the old one keep a consistent view.
+
+    Each car's detail dict and its JSON encoding are built once when the
+    catalog is loaded, so responses can be assembled from cached bytes.
+    `version` is a content hash that changes whenever the catalog data does;
+    it is the basis of the HTTP ETags of catalog-derived responses.
+    """
+
+    def __init__(self, car_df, version=None):
+        car_df = car_df.reset_index(drop=True)
+        self.car_df = car_df
+        self.version = version or content_hash(car_df)
+        self.feature_index = build_feature_index(car_df)
+        self.details = build_car_details(car_df)
+        self.fragments = {car_id: json.dumps(detail).encode() for car_id, detail in self.details.items()}
+        if car_df.empty:
+            self.locations = []
+            self.car_types = DEFAULT_CAR_TYPES
+        else:
+            self.locations = sorted(car_df['City'].unique().tolist())
+            self.car_types = sorted(car_df['Car Type'].unique().tolist())
+        # Lower-cased city -> array of that city's Car_Ids, for filtering model scores by city
+        self.car_ids_by_city = {} if car_df.empty else {
+            city: ids for city, ids in car_df.groupby(car_df['City'].str.lower())['Car_Id'].unique().items()}
+        self.locations_json = json.dumps({"locations": self.locations}).encode()
+        self.car_types_json = json.dumps({"car_types": self.car_types}).encode()
+
+    def etag(self, resource):
+        """Strong ETag for a response derived from this catalog version."""
+        return f"{resource}-{self.version[:32]}"
+
+    def __len__(self):
+        return len(self.details)
+
+    def get(self, car_id):
+        """Detail dict for one car (a copy callers may modify), or None."""
+        detail = self.details.get(_as_key(car_id))
+        return dict(detail) if detail is not None else None
+
+    def get_many(self, car_ids):
+        """Detail dicts for the cars that exist, in the given order."""
+        details = (self.details.get(_as_key(car_id)) for car_id in car_ids)
+        return [dict(detail) for detail in details if detail is not None]
+
+    def render_many(self, car_ids):
+        """
+        JSON array of the given cars' details, joined from the cached fragments.
+
+        Returns:
+            tuple: (bytes, number of cars rendered)
+        """
+        fragments = [fragment for fragment in (self.fragments.get(_as_key(car_id)) for car_id in car_ids)
+                     if fragment is not None]
+        return b"[" + b",".join(fragments) + b"]", len(fragments)
+
+
+def _as_key(car_id):
+    # Catalog keys are Python ints; accept NumPy and integral float ids too
+    if isinstance(car_id, np.integer) or (isinstance(car_id, (float, np.floating)) and float(car_id).is_integer()):
+        return int(car_id)
+    return car_id
@@ -0,0 +1,318 @@
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, OperationFailure
+from dotenv import load_dotenv
+from modules.db_indexes import covered_projection, ensure_indexes, USER_ID_PROJECTION
+from modules.metrics import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMATS = ('.parquet', '.csv')
+
+
+class DataSource(ABC):
+    """
+    Where the recommender reads its collections from and writes new users and rentals to.
+
+    Collections are addressed by their MongoDB names ('car', 'rentals', 'user', 'users').
+    """
+    client = None
+    db = None
+    available = True
+
+    def __init__(self):
+        # collection name -> names of database indexes ensured at startup
+        self.indexes = {}
+
+    @abstractmethod
+    def load(self, collection_name):
+        """Return the whole collection as a DataFrame (empty if unavailable)."""
+
+    @abstractmethod
+    def find_user(self, name, email):
+        """Return {'user_id': ...} for the user with this name and email, or None."""
+
+    @abstractmethod
+    def max_value(self, collection_name, field):
+        """Return the largest value of `field` in the collection, or None if it is empty."""
+
+    @abstractmethod
+    def insert(self, collection_name, document):
+        """Insert one document into the collection."""
+
+    @abstractmethod
+    def insert_with_next_id(self, collection_name, field, document):
+        """
+        Insert `document` with `field` set to one more than the collection's
+        current maximum (0 for an empty collection), without handing the same
+        value to two concurrent writers.
+
+        Returns:
+            int: The value assigned to `field`
+        """
+
+
+class MongoDataSource(DataSource):
+    """Reads and writes the live MongoDB database."""
+
+    # Attempts at claiming the next id when other writers keep taking it first
+    NEXT_ID_ATTEMPTS = 5
+
+    def __init__(self, uri=None, db_name='tripglide'):
+        super().__init__()
+        self.client = self.connect_to_db(uri if uri is not None else os.getenv('MONGO_URI'))
+        self.db = self.client[db_name] if self.client else None
+        self.available = self.db is not None
+        self.indexes = ensure_indexes(self.db) if self.available else {}
+
+    def connect_to_db(self, mongo_uri):
+        """Establish connection to MongoDB database."""
+        try:
+            client = MongoClient(mongo_uri)
+            # Ping the server to verify connection
+            client.admin.command('ping')
+            logger.info("Connected successfully to MongoDB")
+            return client
+        except ConnectionFailure as e:
+            logger.error(f"Database connection failed: {e}")
+            return None
+
+    def load(self, collection_name):
+        """Retrieve data from the specified collection."""
+        try:
+            if self.db is None:
+                return pd.DataFrame()
+
+            with metrics.timer('mongo_operation_seconds', collection=collection_name, operation='find'):
+                # Convert MongoDB cursor to DataFrame
+                df = pd.DataFrame(list(self.db[collection_name].find({})))
+
+            # Convert MongoDB _id to string if present
+            if '_id' in df.columns:
+                df['_id'] = df['_id'].astype(str)
+
+            return df
+        except OperationFailure as e:
+            logger.error(f"Failed to fetch data from {collection_name}: {e}")
+            return pd.DataFrame()
+
+    def find_user(self, name, email):
+        # Covered by the name_email_user_id index (see db_indexes.INDEX_SPECS)
+        with metrics.timer('mongo_operation_seconds', collection='user', operation='find_one'):
+            return self.db['user'].find_one({"name": name, "email": email}, USER_ID_PROJECTION)
+
+    def max_value(self, collection_name, field):
+        # Covered by the descending index on `field` (see db_indexes.INDEX_SPECS)
+        with metrics.timer('mongo_operation_seconds', collection=collection_name, operation='find_one'):
+            document = self.db[collection_name].find_one({}, covered_projection(field), sort=[(field, -1)])
+        return document[field] if document else None
+
+    def insert(self, collection_name, document):
+        with metrics.timer('mongo_operation_seconds', collection=collection_name, operation='insert_one'):
+            self.db[collection_name].insert_one(document)
+
+    def insert_with_next_id(self, collection_name, field, document):
+        # The unique index on `field` (see db_indexes.INDEX_SPECS) rejects an id
+        # another writer claimed between our read and insert; re-read and retry.
+        for attempt in range(1, self.NEXT_ID_ATTEMPTS + 1):
+            current = self.max_value(collection_name, field)
+            document[field] = 0 if current is None else int(current) + 1
+            document.pop('_id', None)  # set by insert_one even when it fails
+            try:
+                self.insert(collection_name, document)
+                return document[field]
+            except DuplicateKeyError:
+                if attempt == self.NEXT_ID_ATTEMPTS:
+                    raise
+                logger.warning("%s %s was taken concurrently; retrying (attempt %d)",
+                               field, document[field], attempt)
+
+
+class InMemoryDataSource(DataSource):
+    """
+    Serves collections from DataFrames held in memory.
+
+    Inserted documents are kept in memory only; they are returned by later
+    lookups and load() calls but never persisted.
+    """
+
+    def __init__(self, frames=None):
+        super().__init__()
+        self.frames = dict(frames or {})
+        self._inserted = {}
+        self._user_index = None
+        self._lock = threading.RLock()
+
+    def _frame(self, collection_name):
+        return self.frames.get(collection_name)
+
+    def load(self, collection_name):
+        frame = self._frame(collection_name)
+        frame = frame if frame is not None else pd.DataFrame()
+        inserted = self._inserted.get(collection_name)
+        if inserted:
+            frame = pd.concat([frame, pd.DataFrame(inserted)], ignore_index=True)
+        return frame
+
+    def find_user(self, name, email):
+        with self._lock:
+            if self._user_index is None:
+                # Built once, like the (name, email) index in MongoDB
+                users = self._frame('user')
+                self._user_index = {}
+                if users is not None and not users.empty:
+                    for user_name, user_email, user_id in zip(users['name'].tolist(), users['email'].tolist(), users['user_id'].tolist()):
+                        self._user_index.setdefault((user_name, user_email), user_id)
+                for document in self._inserted.get('user', []):
+                    self._user_index.setdefault((document.get('name'), document.get('email')), document.get('user_id'))
+            user_id = self._user_index.get((name, email))
+        return None if user_id is None else {"user_id": user_id}
+
+    def max_value(self, collection_name, field):
+        values = [document[field] for document in self._inserted.get(collection_name, []) if field in document]
+        frame = self._frame(collection_name)
+        if frame is not None and field in frame.columns and not frame.empty:
+            values.append(frame[field].max())
+        return max(values) if values else None
+
+    def insert(self, collection_name, document):
+        with self._lock:
+            self._inserted.setdefault(collection_name, []).append(dict(document))
+            if collection_name == 'user' and self._user_index is not None:
+                self._user_index.setdefault((document.get('name'), document.get('email')), document.get('user_id'))
+
+    def insert_with_next_id(self, collection_name, field, document):
+        # Reading the maximum and inserting under one lock makes the pair atomic
+        with self._lock:
+            current = self.max_value(collection_name, field)
+            document[field] = 0 if current is None else int(current) + 1
+            self.insert(collection_name, document)
+            return document[field]
+
+
+class FileDataSource(InMemoryDataSource):
+    """
+    Serves collections from a local snapshot directory containing one
+    <collection>.parquet or <collection>.csv file per collection.
+
+    Files are read on first use. With a `writer` (normally the live
+    MongoDataSource), user lookups, id assignment and inserts go to it, so
+    bookings are persisted and ids stay unique across workers. Without one,
+    writes stay in this process's memory, as for InMemoryDataSource.
+    """
+
+    def __init__(self, directory, writer=None):
+        super().__init__()
+        self.directory = directory
+        self.writer = writer
+        if writer is not None:
+            self.client, self.db, self.available = writer.client, writer.db, writer.available
+            self.indexes = writer.indexes
+
+    def _frame(self, collection_name):
+        if collection_name not in self.frames:
+            self.frames[collection_name] = read_snapshot(self.directory, collection_name)
+        return self.frames[collection_name]
+
+    def find_user(self, name, email):
+        # Users created since the snapshot was taken only exist in the writer
+        if self.writer is not None:
+            return self.writer.find_user(name, email)
+        return super().find_user(name, email)
+
+    def max_value(self, collection_name, field):
+        if self.writer is not None:
+            return self.writer.max_value(collection_name, field)
+        return super().max_value(collection_name, field)
+
+    def insert(self, collection_name, document):
+        if self.writer is not None:
+            return self.writer.insert(collection_name, document)
+        return super().insert(collection_name, document)
+
+    def insert_with_next_id(self, collection_name, field, document):
+        if self.writer is not None:
+            return self.writer.insert_with_next_id(collection_name, field, document)
+        return super().insert_with_next_id(collection_name, field, document)
+
+
+def read_snapshot(directory, collection_name):
+    """Read one collection from a snapshot directory, or None if it has no file."""
+    for extension in SNAPSHOT_FORMATS:
+        path = os.path.join(directory, collection_name + extension)
+        if os.path.exists(path):
+            return pd.read_parquet(path) if extension == '.parquet' else pd.read_csv(path)
+    return None
+
+
+def write_snapshot(source, directory, collections=('car', 'rentals', 'user'), file_format='csv'):
+    """
+    Write collections from any data source to a snapshot directory readable by FileDataSource.
+
+    Args:
+        source (DataSource): Source to read from, typically a MongoDataSource
+        directory (str): Output directory, created if missing
+        collections (iterable, optional): Collection names to export
+        file_format (str, optional): 'csv' or 'parquet' (parquet needs pyarrow)
+    """
+    os.makedirs(directory, exist_ok=True)
+    for collection_name in collections:
+        frame = source.load(collection_name)
+        path = os.path.join(directory, f"{collection_name}.{file_format}")
+        if file_format == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        logger.info(f"Wrote {len(frame)} {collection_name} documents to {path}")
+
+
+def create_data_source(kind=None, snapshot_dir=None):
+    """
+    Build the data source selected by configuration.
+
+    'file' reads from a snapshot and writes to MongoDB (MONGO_URI). Without
+    MONGO_URI it only starts when DATA_SOURCE_OFFLINE is set, since bookings
+    would then live in one worker's memory and be lost on restart.
+
+    Args:
+        kind (str, optional): 'mongo', 'file' or 'memory'. Defaults to the
+            DATA_SOURCE environment variable, then 'mongo'.
+        snapshot_dir (str, optional): Snapshot directory for 'file'. Defaults
+            to the DATA_SNAPSHOT_DIR environment variable.
+
+    Returns:
+        DataSource
+    """
+    kind = (kind or os.getenv('DATA_SOURCE', 'mongo')).lower()
+    if kind == 'mongo':
+        return MongoDataSource()
+    if kind == 'file':
+        snapshot_dir = snapshot_dir or os.getenv('DATA_SNAPSHOT_DIR')
+        if not snapshot_dir:
+            raise ValueError("DATA_SNAPSHOT_DIR must be set when DATA_SOURCE is 'file'")
+        if os.getenv('MONGO_URI'):
+            return FileDataSource(snapshot_dir, writer=MongoDataSource())
+        if os.getenv('DATA_SOURCE_OFFLINE', 'false').lower() not in ('1', 'true', 'yes'):
+            raise ValueError("DATA_SOURCE 'file' needs MONGO_URI to store bookings; "
+                             "set DATA_SOURCE_OFFLINE=true to keep them in memory instead")
+        logger.warning("Serving from snapshot %s without a database: new users and rentals are kept "
+                       "in this process only, are not shared between workers and are lost on restart",
+                       snapshot_dir)
+        return FileDataSource(snapshot_dir)
+    if kind == 'memory':
+        return InMemoryDataSource()
+    raise ValueError(f"Unknown DATA_SOURCE '{kind}'. Choose from mongo, file, memory.")
+
+
+if __name__ == '__main__':
+    # Export the live database to a local snapshot:
+    #   python -m modules.data_sources <directory> [csv|parquet]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    write_snapshot(MongoDataSource(), sys.argv[1], file_format=sys.argv[2] if len(sys.argv) > 2 else 'csv')
@@ -0,0 +1,62 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Indexes required by the recommender's access patterns, per collection.
+# Each index includes every field the matching query filters, sorts or projects
+# on, so those queries are answered from the index alone (covered queries).
+INDEX_SPECS = {
+    # check_user_exists: find_one({"name", "email"}) projecting user_id
+    'user': [
+        IndexModel([("name", ASCENDING), ("email", ASCENDING), ("user_id", ASCENDING)],
+                   name="name_email_user_id"),
+    ],
+    # create_new_user: find_one(sort=[("user_id", -1)]) projecting user_id; unique so a
+    # concurrently claimed id fails the insert and is retried (insert_with_next_id)
+    'users': [
+        IndexModel([("user_id", DESCENDING)], name="user_id_desc", unique=True),
+    ],
+    # record_rental / get_last_travel_code: find_one(sort=[("travelCode", -1)]); unique as above
+    'rentals': [
+        IndexModel([("travelCode", DESCENDING)], name="travelCode_desc", unique=True),
+    ],
+}
+
+logger = logging.getLogger(__name__)
+
+
+def covered_projection(*fields):
+    """Projection returning only `fields`; _id must be excluded for a query to be covered."""
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+USER_ID_PROJECTION = covered_projection("user_id")
+
+
+def ensure_indexes(db, specs=None):
+    """
+    Create any missing indexes declared in INDEX_SPECS.
+
+    create_indexes is a no-op for indexes that already exist with the same
+    definition, so this is safe to run on every startup.
+
+    Args:
+        db: pymongo Database handle
+        specs (dict, optional): collection name -> list of IndexModel.
+            Defaults to INDEX_SPECS.
+
+    Returns:
+        dict: collection name -> list of index names created or confirmed
+    """
+    specs = INDEX_SPECS if specs is None else specs
+    ensured = {}
+    for collection_name, indexes in specs.items():
+        try:
+            ensured[collection_name] = db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # Typically a unique index over existing duplicate values; the app
+            # still works, just without the index, so don't block startup.
+            logger.warning(f"Failed to ensure indexes on {collection_name}: {e}")
+            ensured[collection_name] = []
+    return ensured
+
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from modules.catalog import numeric_column
+
+# Default weights of the linear re-ranking score; the base score is the
+# candidate generator's own (similarity or model) score scaled to [0, 1]
+DEFAULT_WEIGHTS = {
+    "base": 1.0,
+    "rating": 0.2,
+    "utilization": 0.2,
+    "price_fit": 0.3,
+}
+
+
+def _grouped_mean(index, values, size):
+    """Mean of `values` per group in `index`, ignoring NaN; NaN for groups with no values."""
+    valid = ~np.isnan(values)
+    totals = np.bincount(index[valid], weights=values[valid], minlength=size)
+    counts = np.bincount(index[valid], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+class RentalFeatures:
+    """
+    Per-user and per-car aggregates of rental history, computed in one vectorized pass.
+
+    Users: typical rental duration in hours and typical spend per rental.
+    Cars: number of rentals and utilization, the car's rented hours relative
+    to the busiest car. Arrays are aligned with the sorted id arrays and
+    looked up with searchsorted, so a batch of candidates costs a few array ops.
+    """
+
+    def __init__(self, rental_df):
+        rentals = rental_df if rental_df is not None else pd.DataFrame()
+        user_ids = numeric_column(rentals, 'user_id')
+        car_ids = numeric_column(rentals, 'Car_Id')
+
+        hours = numeric_column(rentals, 'Duration_Hours')
+        # Older rentals may only record whole days
+        days = numeric_column(rentals, 'Days')
+        hours = np.where(np.isnan(hours), days * 24, hours)
+        spend = numeric_column(rentals, 'total_amount')
+
+        users = ~np.isnan(user_ids)
+        self.user_ids, user_index = np.unique(user_ids[users].astype(np.int64), return_inverse=True)
+        self.user_hours = _grouped_mean(user_index, hours[users], len(self.user_ids))
+        self.user_spend = _grouped_mean(user_index, spend[users], len(self.user_ids))
+
+        cars = ~np.isnan(car_ids)
+        self.car_ids, car_index = np.unique(car_ids[cars].astype(np.int64), return_inverse=True)
+        self.car_rentals = np.bincount(car_index, minlength=len(self.car_ids))
+        car_hours = np.bincount(car_index, weights=np.nan_to_num(hours[cars]), minlength=len(self.car_ids))
+        busiest = car_hours.max() if len(car_hours) else 0
+        self.car_utilization = car_hours / busiest if busiest > 0 else np.zeros(len(self.car_ids))
+
+        # Fallbacks for users with no (usable) history
+        self.default_hours = float(np.nanmedian(self.user_hours)) if np.isfinite(self.user_hours).any() else 24.0
+        self.default_spend = float(np.nanmedian(self.user_spend)) if np.isfinite(self.user_spend).any() else np.nan
+
+    def user_profile(self, user_id):
+        """(typical hours, typical spend) for a user, falling back to the population medians."""
+        hours, spend = self.default_hours, self.default_spend
+        if user_id is not None and len(self.user_ids):
+            row = np.searchsorted(self.user_ids, int(user_id))
+            if row < len(self.user_ids) and self.user_ids[row] == int(user_id):
+                if np.isfinite(self.user_hours[row]):
+                    hours = self.user_hours[row]
+                if np.isfinite(self.user_spend[row]):
+                    spend = self.user_spend[row]
+        return hours, spend
+
+    def utilization(self, car_ids):
+        """Utilization of each car in `car_ids` (0 for cars never rented)."""
+        car_ids = np.asarray(car_ids, dtype=np.int64)
+        if not len(self.car_ids):
+            return np.zeros(len(car_ids))
+        rows = np.minimum(np.searchsorted(self.car_ids, car_ids), len(self.car_ids) - 1)
+        return np.where(self.car_ids[rows] == car_ids, self.car_utilization[rows], 0.0)
+
+
+class LinearReranker:
+    """
+    Re-orders candidate cars by a weighted sum of features:
+
+    - base: the candidate generator's score, min-max scaled within the batch
+    - rating: Rating / 5
+    - utilization: how much the car is rented relative to the busiest car
+    - price_fit: 1 when the car's price over the user's typical rental
+      duration equals their typical spend, decaying as the ratio moves away
+    """
+
+    def __init__(self, features, weights=None):
+        self.features = features
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    def scores(self, candidates, base_scores, user_id=None):
+        """
+        Re-ranking score of each candidate.
+
+        Args:
+            candidates (DataFrame): Candidate cars with Car_Id, Price per Hour (INR) and Rating
+            base_scores (array-like): Generator score per candidate, same order
+            user_id (optional): User to personalise duration and spend for
+
+        Returns:
+            ndarray: One score per candidate
+        """
+        base = np.asarray(base_scores, dtype=float)
+        spread = base.max() - base.min() if len(base) else 0
+        base = (base - base.min()) / spread if spread > 0 else np.ones(len(base))
+
+        rating = np.nan_to_num(numeric_column(candidates, 'Rating')) / 5.0
+        utilization = self.features.utilization(candidates['Car_Id'].to_numpy())
+
+        hours, spend = self.features.user_profile(user_id)
+        expected_cost = numeric_column(candidates, 'Price per Hour (INR)') * hours
+        if np.isfinite(spend) and spend > 0:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                price_fit = np.exp(-np.abs(np.log(expected_cost / spend)))
+            price_fit = np.nan_to_num(price_fit)
+        else:
+            price_fit = np.zeros(len(candidates))
+
+        w = self.weights
+        return (w["base"] * base + w["rating"] * rating
+                + w["utilization"] * utilization + w["price_fit"] * price_fit)
+
+    def order(self, candidates, base_scores, user_id=None):
+        """Positions of `candidates` from best to worst re-ranking score (stable for ties)."""
+        return np.argsort(-self.scores(candidates, base_scores, user_id), kind="stable")
@@ -0,0 +1,177 @@
+import logging
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+class ImplicitALS:
+    """
+    Matrix factorization for implicit feedback (rental counts), trained with
+    alternating least squares as in Hu, Koren & Volinsky (2008).
+
+    Each observed (user, car) count r becomes a preference of 1 with
+    confidence 1 + alpha * r; unobserved pairs are preferences of 0 with
+    confidence 1. Factors are stored as float32 and scoring a user is a
+    single matrix-vector product over the candidate cars.
+    """
+
+    def __init__(self, factors=32, regularization=0.1, alpha=40.0, iterations=15, seed=0):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.seed = seed
+        self.user_ids = None      # sorted external user ids, row i of user_factors
+        self.item_ids = None      # sorted external Car_Ids, row j of item_factors
+        self.user_factors = None
+        self.item_factors = None
+        self.interactions = None  # CSR users x items of rental counts, for excluding seen cars
+
+    def fit(self, user_ids, item_ids, counts=None):
+        """
+        Train on (user, item) interaction pairs.
+
+        Args:
+            user_ids (array-like): User id of each interaction
+            item_ids (array-like): Car_Id of each interaction
+            counts (array-like, optional): Weight of each interaction; 1 per row by default.
+                Duplicate pairs are summed, so raw rental rows can be passed directly.
+
+        Returns:
+            ImplicitALS: self
+        """
+        self.user_ids, user_index = np.unique(np.asarray(user_ids), return_inverse=True)
+        self.item_ids, item_index = np.unique(np.asarray(item_ids), return_inverse=True)
+        counts = np.ones(len(user_index), dtype=np.float32) if counts is None else np.asarray(counts, dtype=np.float32)
+        shape = (len(self.user_ids), len(self.item_ids))
+        matrix = sparse.coo_matrix((counts, (user_index, item_index)), shape=shape).tocsr()
+        matrix.sum_duplicates()
+        self.interactions = matrix
+
+        rng = np.random.default_rng(self.seed)
+        users = rng.normal(scale=0.01, size=(shape[0], self.factors))
+        items = rng.normal(scale=0.01, size=(shape[1], self.factors))
+        item_major = matrix.T.tocsr()
+        for iteration in range(self.iterations):
+            users = self._solve(matrix, items)
+            items = self._solve(item_major, users)
+            logger.debug("ALS iteration %d/%d done", iteration + 1, self.iterations)
+
+        self.user_factors = users.astype(np.float32)
+        self.item_factors = items.astype(np.float32)
+        return self
+
+    def _solve(self, matrix, fixed):
+        """Least-squares update of every row's factors given the other side's `fixed` factors."""
+        gram = fixed.T @ fixed
+        identity = self.regularization * np.eye(self.factors)
+        solved = np.zeros((matrix.shape[0], self.factors))
+        indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+        for row in range(matrix.shape[0]):
+            start, end = indptr[row], indptr[row + 1]
+            if start == end:
+                continue
+            neighbours = fixed[indices[start:end]]
+            confidence = 1.0 + self.alpha * data[start:end]
+            # (Y^T C Y + reg I) x = Y^T C p, with Y^T C Y = Y^T Y + Y^T (C - I) Y and p = 1 on observed items
+            lhs = gram + (neighbours.T * (confidence - 1.0)) @ neighbours + identity
+            rhs = neighbours.T @ confidence
+            solved[row] = np.linalg.solve(lhs, rhs)
+        return solved
+
+    def has_user(self, user_id):
+        return self._user_row(user_id) is not None
+
+    def _user_row(self, user_id):
+        row = np.searchsorted(self.user_ids, user_id)
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def recommend(self, user_id, k=40, candidates=None, exclude_seen=True):
+        """
+        Top-k cars for a user by predicted preference.
+
+        Args:
+            user_id: External user id
+            k (int, optional): Number of cars to return
+            candidates (array-like, optional): Car_Ids to restrict scoring to,
+                e.g. the cars in the user's selected city
+            exclude_seen (bool, optional): Drop cars the user has already rented
+
+        Returns:
+            list: (Car_Id, score) pairs, best first; empty for unknown users
+        """
+        row = self._user_row(user_id)
+        if row is None:
+            return []
+
+        if candidates is None:
+            item_rows = np.arange(len(self.item_ids))
+        else:
+            candidates = np.asarray(candidates)
+            item_rows = np.searchsorted(self.item_ids, candidates)
+            known = item_rows < len(self.item_ids)
+            known[known] = self.item_ids[item_rows[known]] == candidates[known]
+            item_rows = item_rows[known]
+
+        if exclude_seen:
+            seen = self.interactions.indices[self.interactions.indptr[row]:self.interactions.indptr[row + 1]]
+            item_rows = item_rows[~np.isin(item_rows, seen)]
+        if len(item_rows) == 0:
+            return []
+
+        scores = self.item_factors[item_rows] @ self.user_factors[row]
+        top = min(k, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(self.item_ids[item_rows[i]].item(), float(scores[i])) for i in best]
+
+    def save(self, path):
+        """Write the trained model to an .npz file."""
+        np.savez_compressed(
+            path,
+            user_ids=self.user_ids, item_ids=self.item_ids,
+            user_factors=self.user_factors, item_factors=self.item_factors,
+            indptr=self.interactions.indptr, indices=self.interactions.indices, data=self.interactions.data,
+            params=np.array([self.factors, self.regularization, self.alpha, self.iterations, self.seed]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a model written by save()."""
+        with np.load(path, allow_pickle=False) as saved:
+            factors, regularization, alpha, iterations, seed = saved['params']
+            model = cls(int(factors), float(regularization), float(alpha), int(iterations), int(seed))
+            model.user_ids = saved['user_ids']
+            model.item_ids = saved['item_ids']
+            model.user_factors = saved['user_factors']
+            model.item_factors = saved['item_factors']
+            model.interactions = sparse.csr_matrix(
+                (saved['data'], saved['indices'], saved['indptr']),
+                shape=(len(model.user_ids), len(model.item_ids)))
+        return model
+
+
+def train_from_rentals(rental_df, **params):
+    """Fit an ImplicitALS model on a rentals DataFrame (one row per rental)."""
+    return ImplicitALS(**params).fit(rental_df['user_id'].to_numpy(), rental_df['Car_Id'].to_numpy())
+
+
+if __name__ == '__main__':
+    # Train offline from the configured data source:
+    #   python -m modules.matrix_factorization <output.npz> [factors] [iterations]
+    import sys
+    import time
+    from modules.data_sources import create_data_source
+    logging.basicConfig(level=logging.INFO)
+    rentals = create_data_source().load('rentals')
+    start = time.perf_counter()
+    model = train_from_rentals(
+        rentals,
+        factors=int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+        iterations=int(sys.argv[3]) if len(sys.argv) > 3 else 15)
+    model.save(sys.argv[1])
+    logger.info(f"Trained on {len(rentals)} rentals ({len(model.user_ids)} users, {len(model.item_ids)} cars) "
+                f"in {time.perf_counter() - start:.1f}s; saved to {sys.argv[1]}")
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow network calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Timer:
+    """Context manager that records its elapsed time into a histogram."""
+    __slots__ = ('registry', 'key', 'start')
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Shared no-op timer used when metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    In-process histograms and counters, rendered in the Prometheus text format.
+
+    When disabled, timer() returns a shared no-op context manager and the
+    recording methods return immediately, so instrumentation can stay in the
+    hot paths.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        """Set the HELP text for a metric."""
+        self._help[name] = help_text
+
+    def timer(self, name, **labels):
+        """Time a block into histogram `name` with the given labels."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, (name, tuple(sorted(labels.items()))))
+
+    def observe(self, name, value, **labels):
+        """Record a single value into histogram `name`."""
+        if self.enabled:
+            self._observe((name, tuple(sorted(labels.items()))), value)
+
+    def inc(self, name, amount=1, **labels):
+        """Increment counter `name`."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count_cache(self, cache, hit):
+        """Record a hit or miss for the named cache."""
+        self.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def _observe(self, key, value):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted((key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), counts, total, count in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+metrics = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'))
+metrics.describe('recommender_stage_seconds', "Time spent in each recommendation pipeline stage.")
+metrics.describe('mongo_operation_seconds', "Duration of MongoDB calls.")
+metrics.describe('stripe_request_seconds', "Duration of Stripe API calls.")
+metrics.describe('catalog_reloads_total', "Catalog reloads that swapped in a changed catalog.")
+metrics.describe('cache_requests_total', "Cache lookups by cache and result.")
+metrics.describe('bookings_not_saved_total', "Paid bookings whose user or rental could not be stored.")
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+import uuid
+from modules.metrics import metrics
+
+
+# PaymentIntent statuses that never change again, so a retrieved intent in one of them can be reused
+TERMINAL_STATUSES = ('succeeded', 'canceled')
+
+
+def idempotency_key(*parts):
+    """Stable idempotency key for a logical operation, e.g. one checkout's create."""
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class _Call:
+    """An in-flight retrieve that concurrent callers for the same intent wait on."""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PaymentGateway:
+    """
+    Stripe PaymentIntent calls through one pooled, time-limited client.
+
+    - A single StripeClient with a shared requests.Session keeps connections
+      to the API alive, so each call skips the TCP/TLS handshake. Every call
+      is bounded by `timeout` and retried up to `max_retries` times by the SDK.
+    - create and modify always send an Idempotency-Key; callers pass a stable
+      key (see idempotency_key()) so a resubmitted checkout returns the same
+      intent instead of creating another.
+    - Concurrent retrieves of the same intent share one request, and intents
+      in a terminal status are reused for `retrieve_ttl` seconds, so repeated
+      process_payment submissions don't each make a round trip.
+
+    The gateway is synchronous by design: a view calling it holds its worker
+    thread for the whole Stripe round trip. Freeing the worker would need an
+    ASGI server or gevent workers, and the app runs under WSGI with CPU-bound
+    recommender threads that neither would suit; Flask's async views still
+    occupy the thread. Checkout concurrency is therefore set by the thread
+    count (e.g. gunicorn --threads), which the shorter, pooled calls make
+    cheaper to raise.
+
+    The stripe module is imported on first use.
+    """
+
+    def __init__(self, api_key, api_base=None, timeout=10.0, max_retries=2, pool_size=20, retrieve_ttl=30.0):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.retrieve_ttl = retrieve_ttl
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._inflight = {}
+        self._recent = {}  # intent id -> (expiry, intent), terminal statuses only
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The StripeClient, created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        import requests
+        import stripe
+        from requests.adapters import HTTPAdapter
+
+        # One session for all threads: its connection pool holds up to pool_size keep-alive connections
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        http_client = stripe.RequestsClient(timeout=self.timeout, session=session)
+        base_addresses = {'api': self.api_base} if self.api_base else {}
+        return stripe.StripeClient(self.api_key, http_client=http_client, base_addresses=base_addresses,
+                                   max_network_retries=self.max_retries)
+
+    def create_payment_intent(self, amount, currency, metadata, idempotency_key=None):
+        """
+        Create a PaymentIntent.
+
+        Args:
+            amount (int): Amount in the currency's smallest unit
+            currency (str): Three-letter currency code
+            metadata (dict): Metadata stored on the intent
+            idempotency_key (str, optional): Key identifying this logical create; random if omitted
+
+        Returns:
+            PaymentIntent: The created (or, for a repeated key, the original) intent
+        """
+        params = {'amount': amount, 'currency': currency, 'metadata': metadata}
+        with metrics.timer('stripe_request_seconds', operation='payment_intent.create'):
+            return self.client.payment_intents.create(params=params, options=self._options(idempotency_key))
+
+    def modify_payment_intent(self, payment_intent_id, idempotency_key=None, **params):
+        """Update a PaymentIntent with `params` (e.g. receipt_email, metadata)."""
+        with metrics.timer('stripe_request_seconds', operation='payment_intent.modify'):
+            intent = self.client.payment_intents.update(payment_intent_id, params=params,
+                                                        options=self._options(idempotency_key))
+        self._forget(payment_intent_id)
+        return intent
+
+    def retrieve_payment_intent(self, payment_intent_id):
+        """
+        Retrieve a PaymentIntent, sharing the request with concurrent callers for the same id.
+
+        Raises whatever the underlying request raised, in every waiting caller.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._recent.get(payment_intent_id)
+            if cached is not None and cached[0] > now:
+                metrics.count_cache('stripe_retrieve', True)
+                return cached[1]
+            call = self._inflight.get(payment_intent_id)
+            leader = call is None
+            if leader:
+                call = self._inflight[payment_intent_id] = _Call()
+
+        if not leader:
+            metrics.count_cache('stripe_retrieve', True)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.count_cache('stripe_retrieve', False)
+        try:
+            with metrics.timer('stripe_request_seconds', operation='payment_intent.retrieve'):
+                call.result = self.client.payment_intents.retrieve(payment_intent_id)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[payment_intent_id]
+                if call.result is not None and call.result.status in TERMINAL_STATUSES and self.retrieve_ttl > 0:
+                    self._recent[payment_intent_id] = (time.monotonic() + self.retrieve_ttl, call.result)
+                    self._prune(time.monotonic())
+            call.done.set()
+        return call.result
+
+    def _options(self, key):
+        # The SDK would also generate a key, but a caller-chosen one survives a resubmission
+        return {'idempotency_key': key or str(uuid.uuid4())}
+
+    def _forget(self, payment_intent_id):
+        with self._lock:
+            self._recent.pop(payment_intent_id, None)
+
+    def _prune(self, now):
+        # Called with the lock held; expired entries are only dropped once the cache grows
+        if len(self._recent) > 1024:
+            self._recent = {key: entry for key, entry in self._recent.items() if entry[0] > now}
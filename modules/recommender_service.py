@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ('eager', 'background', 'lazy')
+
+
+class RecommenderService:
+    """
+    Owns the application's CarRecommendationSystem and builds it off the import path.
+
+    The recommender is constructed by `factory` either immediately ('eager'),
+    on a daemon thread started by start() ('background'), or on first use
+    ('lazy'). After construction warm_up() is called so the first request
+    doesn't pay for loading the model libraries or building lookup tables.
+
+    A failed build is retried up to `attempts` times in total, waiting
+    `backoff` seconds after the first failure and doubling each time (at most
+    `max_backoff`). In eager mode the error is raised from start() instead, so
+    a broken deployment fails at startup. Once the attempts are used up the
+    service is `failed` and the liveness probe reports it, so the process is
+    restarted rather than answering 503 forever.
+    """
+
+    def __init__(self, factory, mode='background', attempts=5, backoff=2.0, max_backoff=60.0):
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"Unknown warm-up mode '{mode}'. Choose from {', '.join(WARMUP_MODES)}.")
+        self.factory = factory
+        self.mode = mode
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.error = None
+        self.load_seconds = None
+        self._recommender = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._ready = threading.Event()  # set once built, or once the attempts are used up
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Begin construction according to the warm-up mode; raises the build error in eager mode."""
+        if self.mode == 'eager':
+            self._build(raise_errors=True)
+        elif self.mode == 'background':
+            self._thread = threading.Thread(target=self._build_with_retries, name='recommender-warmup', daemon=True)
+            self._thread.start()
+
+    @property
+    def ready(self):
+        return self._recommender is not None
+
+    @property
+    def failed(self):
+        """True once every build attempt has failed."""
+        return self._failures >= self.attempts
+
+    def get(self, timeout=None):
+        """
+        Return the recommender, building it first in lazy mode.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a background build
+
+        Returns:
+            CarRecommendationSystem, or None if it is not ready within the timeout,
+            a lazy build failed and is waiting to be retried, or every attempt failed
+        """
+        if self._recommender is None and not self.failed:
+            if self._thread is None:
+                if time.monotonic() >= self._retry_at:
+                    self._build()
+            else:
+                self._ready.wait(timeout)
+        return self._recommender
+
+    def status(self):
+        """Readiness details for the health endpoints."""
+        status = {
+            "ready": self.ready,
+            "mode": self.mode,
+            "load_seconds": self.load_seconds,
+        }
+        if self.error is not None:
+            status["error"] = self.error
+            status["failed_attempts"] = self._failures
+            status["failed"] = self.failed
+        if self._recommender is not None:
+            status.update(self._recommender.index_status())
+        return status
+
+    def _build_with_retries(self):
+        while not self._build() and not self.failed:
+            time.sleep(max(0.0, self._retry_at - time.monotonic()))
+
+    def _build(self, raise_errors=False):
+        """Make one build attempt unless already built or given up; returns whether the recommender is ready."""
+        with self._lock:
+            if self._recommender is not None or self.failed:
+                return self._recommender is not None
+            start = time.perf_counter()
+            try:
+                recommender = self.factory()
+                recommender.warm_up()
+            except Exception as e:
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self._failures += 1
+                self.error = str(e)
+                if raise_errors:
+                    raise
+                if self.failed:
+                    logger.exception("Failed to build recommender; giving up after %d attempts", self._failures)
+                    self._ready.set()
+                else:
+                    delay = min(self.backoff * 2 ** (self._failures - 1), self.max_backoff)
+                    self._retry_at = time.monotonic() + delay
+                    logger.exception("Failed to build recommender (attempt %d/%d); retrying in %gs",
+                                     self._failures, self.attempts, delay)
+                return False
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self._recommender = recommender
+            self.error = None
+            self._ready.set()
+            logger.info(f"Recommender ready in {self.load_seconds}s")
+            return True
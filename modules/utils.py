@@ -1,28 +1,47 @@
+import logging
+import random
 import numpy as np
-import json
+from flask.json.provider import DefaultJSONProvider
 
-def convert_numpy_types(obj):
-    """Convert numpy types to native Python types for JSON serialization."""
-    if isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(element) for element in obj]
-    else:
-        return obj
-
-class NumpyEncoder(json.JSONEncoder):
-    """Custom JSON encoder to handle NumPy types."""
-    def default(self, obj):
-        if isinstance(obj, (np.integer)):
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes NumPy scalars and arrays natively (app.json_encoder is ignored by Flask 3)."""
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, np.integer):
             return int(obj)
-        elif isinstance(obj, (np.floating)):
+        elif isinstance(obj, np.floating):
             return float(obj)
         elif isinstance(obj, np.ndarray):
             return obj.tolist()
-        return super().default(obj)
\ No newline at end of file
+        return DefaultJSONProvider.default(obj)
+
+class SamplingFilter(logging.Filter):
+    """Pass only a fraction of records below WARNING; warnings and errors always pass."""
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+def configure_logging(level='INFO', sample_rate=1.0):
+    """
+    Configure root logging with a level and sampling for sub-WARNING records.
+
+    Like logging.basicConfig, this does nothing if the root logger already has
+    handlers, so a host's setup (gunicorn's, pytest's caplog) is left alone.
+
+    Args:
+        level (str): Minimum level name, e.g. 'DEBUG' or 'INFO'
+        sample_rate (float): Fraction of DEBUG/INFO records to keep
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
@@ -0,0 +1,23 @@
+import pytest
+from app import create_app
+from benchmarks.synthetic import generate_cars, generate_rentals, generate_users
+from modules.data_sources import InMemoryDataSource
+
+
+@pytest.fixture(scope='module')
+def client():
+    cars = generate_cars(50)
+    data_source = InMemoryDataSource({'car': cars, 'user': generate_users(20),
+                                      'rentals': generate_rentals(200, cars, 20)})
+    app = create_app({'RECOMMENDER_WARMUP': 'eager', 'TESTING': True}, data_source)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path', ['/', '/api/locations', '/api/car_types'])
+def test_matching_etag_is_not_modified(client, path):
+    etag = client.get(path).headers['ETag']
+
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+    # A compressing proxy hands the ETag back weakened
+    assert client.get(path, headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+    assert client.get(path, headers={'If-None-Match': '"stale"'}).status_code == 200
@@ -0,0 +1,152 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from modules.payments import PaymentGateway, idempotency_key
+
+
+class FakeIntents:
+    """Stands in for StripeClient.payment_intents; retrieve blocks until `release` is set."""
+
+    def __init__(self, status='succeeded', error=None):
+        self.status = status
+        self.error = error
+        self.release = threading.Event()
+        self.retrieves = 0
+        self.creates = []
+
+    def retrieve(self, payment_intent_id):
+        self.retrieves += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(id=payment_intent_id, status=self.status)
+
+    def create(self, params, options):
+        self.creates.append((params, options))
+        return SimpleNamespace(id='pi_1', client_secret='pi_1_secret_x')
+
+
+def make_gateway(intents, retrieve_ttl=30.0):
+    gateway = PaymentGateway('sk_test', retrieve_ttl=retrieve_ttl)
+    gateway._client = SimpleNamespace(payment_intents=intents)
+    return gateway
+
+
+def retrieve_concurrently(gateway, intents, callers):
+    """Start `callers` retrieves of one intent, let them pile up, then release the upstream call."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(gateway.retrieve_payment_intent('pi_1'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while intents.retrieves == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)  # let the other callers reach the in-flight call
+    intents.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_retrieves_share_one_upstream_call():
+    intents = FakeIntents()
+    gateway = make_gateway(intents)
+
+    results, errors = retrieve_concurrently(gateway, intents, callers=20)
+
+    assert intents.retrieves == 1
+    assert not errors
+    assert len(results) == 20
+    assert all(result is results[0] for result in results)
+    assert gateway._inflight == {}
+
+
+def test_upstream_error_reaches_every_waiter():
+    failure = RuntimeError("stripe unavailable")
+    intents = FakeIntents(error=failure)
+    gateway = make_gateway(intents)
+
+    results, errors = retrieve_concurrently(gateway, intents, callers=10)
+
+    assert intents.retrieves == 1
+    assert not results
+    assert len(errors) == 10
+    assert all(error is failure for error in errors)
+    assert gateway._inflight == {}
+    assert gateway._recent == {}
+
+
+def test_terminal_intents_are_reused_until_modified():
+    intents = FakeIntents(status='succeeded')
+    intents.release.set()
+    intents.update = lambda payment_intent_id, params, options: SimpleNamespace(id=payment_intent_id)
+    gateway = make_gateway(intents)
+
+    first = gateway.retrieve_payment_intent('pi_1')
+    assert gateway.retrieve_payment_intent('pi_1') is first
+    assert intents.retrieves == 1
+
+    gateway.modify_payment_intent('pi_1', receipt_email='a@example.com')
+    gateway.retrieve_payment_intent('pi_1')
+    assert intents.retrieves == 2
+
+
+@pytest.mark.parametrize('status', ['requires_payment_method', 'processing'])
+def test_non_terminal_intents_are_not_cached(status):
+    intents = FakeIntents(status=status)
+    intents.release.set()
+    gateway = make_gateway(intents)
+
+    gateway.retrieve_payment_intent('pi_1')
+    gateway.retrieve_payment_intent('pi_1')
+    assert intents.retrieves == 2
+
+
+def test_create_sends_the_callers_idempotency_key():
+    intents = FakeIntents()
+    gateway = make_gateway(intents)
+
+    key = idempotency_key('create', 'checkout', 5, 2, 1000, 'a@example.com')
+    gateway.create_payment_intent(1000, 'inr', {'car_id': 5}, idempotency_key=key)
+    gateway.create_payment_intent(1000, 'inr', {'car_id': 5}, idempotency_key=key)
+    gateway.create_payment_intent(1000, 'inr', {'car_id': 5})
+
+    keys = [options['idempotency_key'] for _, options in intents.creates]
+    assert keys[0] == keys[1] == key
+    assert keys[2] != key
+
+
+def test_create_payment_intent_reuses_the_key_within_one_checkout():
+    from app import create_app
+    from benchmarks.synthetic import generate_cars, generate_rentals, generate_users
+    from modules.data_sources import InMemoryDataSource
+
+    cars = generate_cars(50)
+    data_source = InMemoryDataSource({'car': cars, 'user': generate_users(20),
+                                      'rentals': generate_rentals(200, cars, 20)})
+    app = create_app({'RECOMMENDER_WARMUP': 'eager', 'TESTING': True}, data_source)
+    intents = FakeIntents()
+    app.extensions['payments'] = make_gateway(intents)
+    client = app.test_client()
+    car_id = int(cars['Car_Id'].iloc[0])
+
+    def create():
+        response = client.post('/create_payment_intent', json={'car_id': str(car_id), 'rental_days': 2})
+        assert response.status_code == 200
+        return intents.creates[-1][1]['idempotency_key']
+
+    client.get(f'/payment/{car_id}?days=2')
+    first, resubmitted = create(), create()
+    client.get(f'/payment/{car_id}?days=2')
+    next_checkout = create()
+
+    assert first == resubmitted
+    assert next_checkout != first
@@ -0,0 +1,84 @@
+import time
+import pytest
+from modules.recommender_service import RecommenderService
+
+
+class FlakyFactory:
+    """Builds a stub recommender, raising ConnectionError for the first `failures` calls."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("mongo unavailable")
+        return StubRecommender()
+
+
+class StubRecommender:
+    def warm_up(self):
+        pass
+
+    def index_status(self):
+        return {}
+
+
+def test_background_build_retries_until_it_succeeds():
+    factory = FlakyFactory(failures=2)
+    service = RecommenderService(factory, 'background', attempts=5, backoff=0.01)
+    service.start()
+
+    assert service.get(timeout=5) is not None
+    assert factory.calls == 3
+    assert service.error is None
+    assert not service.failed
+
+
+def test_background_build_gives_up_after_its_attempts():
+    factory = FlakyFactory(failures=10)
+    service = RecommenderService(factory, 'background', attempts=3, backoff=0.01)
+    service.start()
+
+    assert service.get(timeout=5) is None
+    assert factory.calls == 3
+    assert service.failed
+    assert service.status()["error"] == "mongo unavailable"
+
+
+def test_lazy_build_waits_for_the_backoff_before_retrying():
+    factory = FlakyFactory(failures=1)
+    service = RecommenderService(factory, 'lazy', attempts=3, backoff=0.2)
+
+    assert service.get() is None
+    assert service.get() is None  # still backing off
+    assert factory.calls == 1
+    time.sleep(0.25)
+    assert service.get() is not None
+    assert factory.calls == 2
+
+
+def test_eager_build_raises():
+    service = RecommenderService(FlakyFactory(failures=1), 'eager')
+    with pytest.raises(ConnectionError):
+        service.start()
+
+
+def test_healthz_fails_once_the_build_gives_up():
+    from app import create_app
+    from modules.data_sources import InMemoryDataSource
+
+    class UnreachableDataSource(InMemoryDataSource):
+        def load(self, collection_name):
+            raise ConnectionError("mongo unavailable")
+
+    app = create_app({'RECOMMENDER_WARMUP': 'lazy', 'RECOMMENDER_BUILD_ATTEMPTS': 2,
+                      'RECOMMENDER_RETRY_BACKOFF': 0, 'TESTING': True}, UnreachableDataSource({}))
+    client = app.test_client()
+
+    assert client.get('/api/locations').status_code == 503
+    assert client.get('/healthz').status_code == 200  # one attempt left
+    assert client.get('/api/locations').status_code == 503
+    assert client.get('/healthz').status_code == 503
+    assert client.get('/readyz').status_code == 503